@@ -0,0 +1,190 @@
+"""
+Benchmark of the discovery pipeline on synthetic datasets.
+
+Run the benchmark and write the timings to a JSON file:
+    python -m benchmarks.discovery_benchmark run --rows 1000 10000 --features 10 --targets 2 --output results.json
+
+Compare the median timings of two runs, e.g. of two commits:
+    python -m benchmarks.discovery_benchmark compare baseline.json results.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from benchmarks.synthetic_dataset import create_synthetic_dataset
+from slamd import create_app
+from slamd.discovery.processing.discovery_persistence import DiscoveryPersistence
+from slamd.discovery.processing.discovery_service import DiscoveryService
+from slamd.discovery.processing.experiment.experiment_model import ExperimentModel
+from slamd.discovery.processing.models.dataset import Dataset
+
+STAGES = ['preprocess', 'create_model', 'fit', 'predict', 'utility', 'novelty', 'output_table', 'scatter_plot']
+# Every run must fit the model from scratch, one target after another, without a t-SNE embedding running alongside.
+# The stage timings are recorded with the prediction, where they are read back like in the result view.
+BENCHMARK_CONFIG = {'PREDICTION_CACHE_MAX_BYTES': 0, 'EXPERIMENT_FIT_WORKERS': 1, 'GP_INCREMENTAL_FIT': False,
+                    'TSNE_BACKGROUND_EMBEDDING': False, 'SHOW_EXPERIMENT_TIMINGS': True}
+BENCHMARK_DATASET = 'benchmark.csv'
+
+
+def create_benchmark_app(config_name):
+    if config_name == 'development':
+        # The tuned models are only offered when running locally
+        os.environ['FLASK_ENV'] = 'development'
+    app = create_app(config_name, with_session=False)
+    # The session only lives as long as the request context of one run, but Flask needs a key to write to it
+    app.config.update({'SECRET_KEY': app.config.get('SECRET_KEY') or 'benchmark', **BENCHMARK_CONFIG})
+    return app
+
+
+def create_request_body(dataset, model):
+    """
+    Return the request body the discovery page sends to run an experiment on the dataset, maximising all targets and a
+    priori information with equal weights.
+    """
+    return {
+        'materials_data_input': dataset.feature_names,
+        'target_properties': dataset.target_names,
+        'a_priori_information': dataset.apriori_names,
+        'model': model,
+        'curiosity': '1.0',
+        'target_configurations': [{'max_or_min': 'max', 'weight': '1.00', 'threshold': ''}
+                                  for _ in dataset.target_names],
+        'a_priori_information_configurations': [{'max_or_min': 'max', 'weight': '1.00', 'threshold': ''}
+                                                for _ in dataset.apriori_names],
+    }
+
+
+def run_experiment_stages(app, dataset, model):
+    """
+    Run the experiment through DiscoveryService.run_experiment and return the time spent in each stage, summed over the
+    targets, together with the stage timings recorded by the experiment.
+    """
+    with app.test_request_context():
+        DiscoveryPersistence.save_dataset(Dataset(name=BENCHMARK_DATASET, dataframe=dataset.dataframe))
+        DiscoveryService.run_experiment(BENCHMARK_DATASET, create_request_body(dataset, model))
+        stage_timings = DiscoveryService.query_experiment_timings()
+
+    timings = dict.fromkeys(STAGES, 0.0)
+    for timing in stage_timings:
+        timings[timing['stage']] += timing['seconds']
+    timings['total'] = sum(timings[stage] for stage in STAGES)
+    return timings, stage_timings
+
+
+def run_benchmark(rows, features, targets, label_fraction, categorical, apriori, models, repeats, config_name):
+    app = create_benchmark_app(config_name)
+
+    results = []
+    for n_rows in rows:
+        dataset = create_synthetic_dataset(n_rows=n_rows, n_features=features, n_targets=targets,
+                                           label_fraction=label_fraction, n_categorical=categorical,
+                                           n_apriori=apriori)
+        for model in models:
+            for repeat in range(repeats):
+                result = {'model': model, 'rows': n_rows, 'repeat': repeat, 'timings': None, 'stages': None,
+                          'error': None}
+                try:
+                    result['timings'], result['stages'] = run_experiment_stages(app, dataset, model)
+                except Exception as error:
+                    result['error'] = f'{type(error).__name__}: {getattr(error, "message", error)}'
+                results.append(result)
+                print(_format_result(result), file=sys.stderr)
+
+    return {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'commit': _git_commit(),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'numpy': np.__version__, 'pandas': pd.__version__, 'scikit-learn': sklearn.__version__},
+        'parameters': {'rows': rows, 'features': features, 'targets': targets, 'label_fraction': label_fraction,
+                       'categorical': categorical, 'apriori': apriori, 'repeats': repeats, 'config': config_name},
+        'results': results,
+    }
+
+
+def summarize(benchmark):
+    """
+    Return the median time of each stage per model and number of rows, skipping failed runs.
+    """
+    timings = {}
+    for result in benchmark['results']:
+        if result['timings'] is not None:
+            timings.setdefault((result['model'], result['rows']), []).append(result['timings'])
+
+    return {key: {stage: statistics.median(run[stage] for run in runs) for stage in STAGES + ['total']}
+            for (key, runs) in timings.items()}
+
+
+def compare(baseline, current):
+    """
+    Return one line per model, number of rows and stage with the median times of both benchmarks and their ratio.
+    """
+    baseline_summary, current_summary = summarize(baseline), summarize(current)
+    lines = [f'{"model":<55} {"rows":>8} {"stage":<12} {"baseline":>10} {"current":>10} {"ratio":>7}']
+    for key in sorted(baseline_summary.keys() & current_summary.keys()):
+        for stage in STAGES + ['total']:
+            before, after = baseline_summary[key][stage], current_summary[key][stage]
+            ratio = f'{after / before:.2f}' if before > 0 else '-'
+            lines.append(f'{key[0]:<55} {key[1]:>8} {stage:<12} {before:>10.4f} {after:>10.4f} {ratio:>7}')
+    return '\n'.join(lines)
+
+
+def _format_result(result):
+    if result['error'] is not None:
+        return f'{result["model"]}, {result["rows"]} rows: {result["error"]}'
+    stages = ', '.join(f'{stage} {result["timings"][stage]:.3f}s' for stage in STAGES)
+    return f'{result["model"]}, {result["rows"]} rows: {stages}, total {result["timings"]["total"]:.3f}s'
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                                text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {'sha': commit.strip(), 'dirty': bool(status.strip())}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the discovery pipeline on synthetic datasets.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmark and write the timings to a JSON file')
+    run_parser.add_argument('--rows', type=int, nargs='+', default=[1000])
+    run_parser.add_argument('--features', type=int, default=10)
+    run_parser.add_argument('--targets', type=int, default=1)
+    run_parser.add_argument('--label-fraction', type=float, default=0.1)
+    run_parser.add_argument('--categorical', type=int, default=0)
+    run_parser.add_argument('--apriori', type=int, default=1)
+    run_parser.add_argument('--models', nargs='+', default=[model.value for model in ExperimentModel],
+                            choices=[model.value for model in ExperimentModel], metavar='MODEL')
+    run_parser.add_argument('--repeats', type=int, default=3)
+    run_parser.add_argument('--config', default='development', choices=['development', 'testing', 'demo'])
+    run_parser.add_argument('--output', default='benchmark_results.json')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare the median timings of two benchmark files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        benchmark = run_benchmark(args.rows, args.features, args.targets, args.label_fraction, args.categorical,
+                                  args.apriori, args.models, args.repeats, args.config)
+        with open(args.output, 'w') as file:
+            json.dump(benchmark, file, indent=2)
+    else:
+        with open(args.baseline) as baseline_file, open(args.current) as current_file:
+            print(compare(json.load(baseline_file), json.load(current_file)))
+
+
+if __name__ == '__main__':
+    main()
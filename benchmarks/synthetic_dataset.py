@@ -0,0 +1,59 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+CATEGORIES = ['A', 'B', 'C', 'D', 'E']
+
+
+@dataclass
+class SyntheticDataset:
+    dataframe: pd.DataFrame = None
+    feature_names: list[str] = field(default_factory=list)
+    target_names: list[str] = field(default_factory=list)
+    apriori_names: list[str] = field(default_factory=list)
+
+
+def create_synthetic_dataset(n_rows=1000, n_features=10, n_targets=1, label_fraction=0.1, n_categorical=0,
+                             n_apriori=1, seed=42):
+    """
+    Create a dataset shaped like a materials dataset for discovery: numeric features, categorical features with a few
+    levels, a priori information columns and targets which are only labelled for a fraction of the rows. The targets
+    are smooth functions of the features plus noise, so the models have something to learn.
+    """
+    if not 0 < label_fraction <= 1:
+        raise ValueError('label_fraction must be in (0, 1]')
+
+    rng = np.random.default_rng(seed)
+    n_numeric = n_features - n_categorical
+    if n_numeric < 1:
+        raise ValueError('At least one feature must be numeric')
+
+    numeric = rng.uniform(size=(n_rows, n_numeric))
+    categorical = rng.integers(0, len(CATEGORIES), size=(n_rows, n_categorical))
+
+    data = {}
+    for i in range(n_numeric):
+        data[f'Feature {i + 1}'] = numeric[:, i]
+    for i in range(n_categorical):
+        data[f'Category {i + 1}'] = np.array(CATEGORIES)[categorical[:, i]]
+
+    n_labelled = max(1, int(round(n_rows * label_fraction)))
+    labelled_rows = rng.choice(n_rows, size=n_labelled, replace=False)
+    for i in range(n_targets):
+        weights = rng.normal(size=n_numeric)
+        target = np.sin(3 * numeric @ weights / np.sqrt(n_numeric)) + 0.5 * categorical.sum(axis=1) / len(CATEGORIES)
+        target += rng.normal(scale=0.05, size=n_rows)
+
+        labels = np.full(n_rows, np.nan)
+        labels[labelled_rows] = target[labelled_rows]
+        data[f'Target {i + 1}'] = labels
+
+    for i in range(n_apriori):
+        data[f'A priori {i + 1}'] = numeric @ rng.uniform(size=n_numeric)
+
+    feature_names = [name for name in data if name.startswith(('Feature', 'Category'))]
+    return SyntheticDataset(dataframe=pd.DataFrame(data),
+                            feature_names=feature_names,
+                            target_names=[f'Target {i + 1}' for i in range(n_targets)],
+                            apriori_names=[f'A priori {i + 1}' for i in range(n_apriori)])
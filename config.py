@@ -7,17 +7,62 @@ class ConfigDevelopment:
     OPENAI_API_TOKEN = os.getenv('OPENAI_API_TOKEN')
     SECRET_KEY = os.getenv('SECRET_KEY')
     SESSION_TYPE = 'filesystem'
+    EXPERIMENT_FIT_WORKERS = int(os.getenv('EXPERIMENT_FIT_WORKERS', 1))
+    EXPERIMENT_JOB_WORKERS = int(os.getenv('EXPERIMENT_JOB_WORKERS', 2))
+    EXPERIMENT_JOB_TTL = int(os.getenv('EXPERIMENT_JOB_TTL', 3600))
+    EXPERIMENT_SHARED_FIT = os.getenv('EXPERIMENT_SHARED_FIT') == 'true'
+    PREDICTION_CACHE_MAX_BYTES = int(os.getenv('PREDICTION_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    GP_INCREMENTAL_FIT = os.getenv('GP_INCREMENTAL_FIT') == 'true'
+    GP_INCREMENTAL_LML_TOLERANCE = float(os.getenv('GP_INCREMENTAL_LML_TOLERANCE', 0.1))
+    GP_RESTART_WORKERS = int(os.getenv('GP_RESTART_WORKERS', 4))
+    GP_RESTART_TOLERANCE = float(os.getenv('GP_RESTART_TOLERANCE')) if os.getenv('GP_RESTART_TOLERANCE') else None
+    LOLOPY_WARM_UP = os.getenv('LOLOPY_WARM_UP', 'true') == 'true'
+    LOLOPY_JVM_MEMORY = os.getenv('LOLOPY_JVM_MEMORY')
+    LOLOPY_JVM_THREADS = os.getenv('LOLOPY_JVM_THREADS')
+    TSNE_CACHE_MAX_ENTRIES = int(os.getenv('TSNE_CACHE_MAX_ENTRIES', 16))
+    TSNE_BACKGROUND_EMBEDDING = os.getenv('TSNE_BACKGROUND_EMBEDDING', 'true') == 'true'
+    OUTPUT_TABLE_TOP_K = int(os.getenv('OUTPUT_TABLE_TOP_K')) if os.getenv('OUTPUT_TABLE_TOP_K') else None
+    SHOW_EXPERIMENT_TIMINGS = os.getenv('SHOW_EXPERIMENT_TIMINGS') == 'true'
 
 
 class ConfigTesting:
     TESTING = True
     WTF_CSRF_ENABLED = False
+    EXPERIMENT_FIT_WORKERS = 1
+    EXPERIMENT_JOB_WORKERS = 1
+    EXPERIMENT_JOB_TTL = 3600
+    EXPERIMENT_SHARED_FIT = False
+    PREDICTION_CACHE_MAX_BYTES = 0
+    GP_INCREMENTAL_FIT = False
+    GP_RESTART_WORKERS = 1
+    GP_RESTART_TOLERANCE = None
+    LOLOPY_WARM_UP = False
+    TSNE_CACHE_MAX_ENTRIES = 0
+    TSNE_BACKGROUND_EMBEDDING = False
+    OUTPUT_TABLE_TOP_K = None
+    SHOW_EXPERIMENT_TIMINGS = False
 
 
 class ConfigDemo:
     OPENAI_API_TOKEN = os.getenv('OPENAI_API_TOKEN')
     SECRET_KEY = os.getenv('SECRET_KEY')
     SESSION_TYPE = 'filesystem'
+    EXPERIMENT_FIT_WORKERS = int(os.getenv('EXPERIMENT_FIT_WORKERS', 1))
+    EXPERIMENT_JOB_WORKERS = int(os.getenv('EXPERIMENT_JOB_WORKERS', 2))
+    EXPERIMENT_JOB_TTL = int(os.getenv('EXPERIMENT_JOB_TTL', 3600))
+    EXPERIMENT_SHARED_FIT = os.getenv('EXPERIMENT_SHARED_FIT') == 'true'
+    PREDICTION_CACHE_MAX_BYTES = int(os.getenv('PREDICTION_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    GP_INCREMENTAL_FIT = os.getenv('GP_INCREMENTAL_FIT') == 'true'
+    GP_INCREMENTAL_LML_TOLERANCE = float(os.getenv('GP_INCREMENTAL_LML_TOLERANCE', 0.1))
+    GP_RESTART_WORKERS = int(os.getenv('GP_RESTART_WORKERS', 4))
+    GP_RESTART_TOLERANCE = float(os.getenv('GP_RESTART_TOLERANCE')) if os.getenv('GP_RESTART_TOLERANCE') else None
+    LOLOPY_WARM_UP = os.getenv('LOLOPY_WARM_UP', 'true') == 'true'
+    LOLOPY_JVM_MEMORY = os.getenv('LOLOPY_JVM_MEMORY')
+    LOLOPY_JVM_THREADS = os.getenv('LOLOPY_JVM_THREADS')
+    TSNE_CACHE_MAX_ENTRIES = int(os.getenv('TSNE_CACHE_MAX_ENTRIES', 16))
+    TSNE_BACKGROUND_EMBEDDING = os.getenv('TSNE_BACKGROUND_EMBEDDING', 'true') == 'true'
+    OUTPUT_TABLE_TOP_K = int(os.getenv('OUTPUT_TABLE_TOP_K')) if os.getenv('OUTPUT_TABLE_TOP_K') else None
+    SHOW_EXPERIMENT_TIMINGS = os.getenv('SHOW_EXPERIMENT_TIMINGS') == 'true'
 
 
 def get_config_obj(config_name):
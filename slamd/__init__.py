@@ -9,6 +9,7 @@ from slamd.common.landing_controller import landing
 from slamd.common.session_backup.session_controller import session_blueprint
 from slamd.formulations.processing.formulations_controller import formulations
 from slamd.discovery.processing.discovery_controller import discovery
+from slamd.discovery.processing.experiment.mlmodel.lolopy_gateway import LolopyGateway
 from slamd.materials.processing.base_materials_controller import base_materials
 from slamd.materials.processing.blended_materials_controller import blended_materials
 from slamd.design_assistant.processing.design_assistant_controller import design_assistant
@@ -37,4 +38,7 @@ def create_app(env=None, with_session=True):
     app.register_error_handler(408, handle_408)
     app.register_error_handler(413, handle_413)
     app.register_error_handler(422, handle_422)
+
+    if app.config.get('LOLOPY_WARM_UP'):
+        LolopyGateway.start_in_background(app.config.get('LOLOPY_JVM_MEMORY'), app.config.get('LOLOPY_JVM_THREADS'))
     return app
@@ -66,6 +66,13 @@ class DatasetNotFoundException(NotFound):
         self.message = message
 
 
+class ExperimentJobNotFoundException(NotFound):
+
+    def __init__(self, message):
+        super().__init__()
+        self.message = message
+
+
 class ValueNotSupportedException(BadRequest):
 
     def __init__(self, message):
@@ -1,5 +1,10 @@
+from flask import current_app, has_app_context
+
 from slamd.common.error_handling import ValueNotSupportedException, SlamdUnprocessableEntityException
 
+# App configuration of worker processes, which run outside of an app context
+_worker_config = {}
+
 
 def empty(input_value):
     if isinstance(input_value, (int, float)):
@@ -71,3 +76,26 @@ def write_dict_into_object(dictionary, target_object):
                                                             f'keys {list(dictionary.keys())}')
 
         target_object.__dict__[key] = dictionary[key]
+
+
+def get_config_value(key, default=None):
+    """
+    Return the value configured for the running app. Outside an app context, e.g. in unit tests or worker processes,
+    return the value passed to init_worker_config or the given default.
+    """
+    if has_app_context():
+        return current_app.config.get(key, default)
+    return _worker_config.get(key, default)
+
+
+def export_config(keys):
+    """
+    Return the configured values of the given keys, which can be sent to worker processes. Only pass the keys the
+    workers need, so that secrets like SECRET_KEY do not leave the app process.
+    """
+    config = current_app.config if has_app_context() else _worker_config
+    return {key: config[key] for key in keys if key in config}
+
+
+def init_worker_config(config):
+    _worker_config.update(config)
@@ -1,8 +1,11 @@
 import json
 import os
+from dataclasses import asdict
+
 from flask import Blueprint, request, render_template, make_response, jsonify, redirect, send_file
 
-from slamd.discovery.processing.discovery_service import DiscoveryService
+from slamd.discovery.processing.discovery_service import DiscoveryService, PREDICTION_PAGE_SIZE
+from slamd.discovery.processing.experiment.stage_timer import log_stage_timings, measure_stage
 from slamd.discovery.processing.forms.discovery_form import DiscoveryForm
 from slamd.discovery.processing.forms.upload_dataset_form import UploadDatasetForm
 from slamd.discovery.processing.targets_service import TargetsService
@@ -92,12 +95,68 @@ def create_a_priori_information_configuration_form():
 def run_experiment(dataset):
     request_body = json.loads(request.data)
     dataframe, scatter_plot = DiscoveryService.run_experiment(dataset, request_body)
-    html_dataframe = dataframe.to_html(index=False,
-                                       table_id='formulations_dataframe',
-                                       classes='table table-bordered table-striped table-hover topscroll-table')
+    return _create_experiment_result_response(dataframe, scatter_plot)
 
-    body = {'template': render_template('experiment_result.html', df=html_dataframe, scatter_plot=scatter_plot)}
-    return make_response(jsonify(body), 200)
+
+@discovery.route('/<dataset>/jobs', methods=['POST'])
+def submit_experiment(dataset):
+    request_body = json.loads(request.data)
+    job_id = DiscoveryService.submit_experiment(dataset, request_body)
+    return make_response(jsonify({'job_id': job_id}), 202)
+
+
+@discovery.route('/jobs/<job_id>', methods=['GET'])
+def query_experiment_status(job_id):
+    status = DiscoveryService.query_experiment_status(job_id)
+    return make_response(jsonify({'job_id': job_id, 'status': status}), 200)
+
+
+@discovery.route('/jobs/<job_id>/result', methods=['GET'])
+def collect_experiment_result(job_id):
+    result = DiscoveryService.collect_experiment_result(job_id)
+    if result is None:
+        # Not finished yet, the client should keep polling
+        return make_response(jsonify({'job_id': job_id, 'status': DiscoveryService.query_experiment_status(job_id)}),
+                             202)
+
+    dataframe, scatter_plot = result
+    return _create_experiment_result_response(dataframe, scatter_plot)
+
+
+@discovery.route('/<dataset>/rescore', methods=['POST'])
+def rescore_experiment(dataset):
+    request_body = json.loads(request.data)
+    result = DiscoveryService.rescore_experiment(dataset, request_body)
+    if isinstance(result, str):
+        # The model has to be fitted again, which runs as a job like a submitted experiment
+        return make_response(jsonify({'job_id': result}), 202)
+
+    dataframe, scatter_plot = result
+    return _create_experiment_result_response(dataframe, scatter_plot)
+
+
+def _create_experiment_result_response(dataframe, scatter_plot):
+    # Only the first page of the table is sent with the result, the other pages are requested from /prediction
+    prediction_page = DiscoveryService.create_prediction_page(dataframe)
+
+    timings = []
+    with measure_stage(timings, 'render'):
+        template = render_template('experiment_result.html', prediction_page=asdict(prediction_page),
+                                   scatter_plot=scatter_plot, stage_timings=DiscoveryService.query_experiment_timings())
+    log_stage_timings(timings, operation='render')
+    return make_response(jsonify({'template': template}), 200)
+
+
+@discovery.route('/prediction', methods=['GET'])
+def query_prediction_page():
+    prediction_page = DiscoveryService.query_prediction_page(
+        page=request.args.get('page', 1, type=int),
+        page_size=request.args.get('page_size', PREDICTION_PAGE_SIZE, type=int),
+        sort_by=request.args.get('sort_by', None),
+        ascending=request.args.get('ascending', 'true') == 'true',
+        search=request.args.get('search', '')
+    )
+    return make_response(jsonify(asdict(prediction_page)), 200)
 
 
 @discovery.route('/<dataset>/download', methods=['GET'])
@@ -1,3 +1,5 @@
+from uuid import uuid4
+
 from flask import session
 
 
@@ -55,6 +57,13 @@ class DiscoveryPersistence:
         """
         return cls.get_session_prediction()
 
+    @classmethod
+    def query_session_id(cls):
+        """
+        Return a random id identifying the current session, which is created on first use.
+        """
+        return cls.get_session_id()
+
     @classmethod
     def find_all_datasets(cls):
         datasets = cls.get_session_property()
@@ -71,6 +80,10 @@ class DiscoveryPersistence:
     def get_session_prediction(cls):
         return session.get('sequential_learning_predictions', {})
 
+    @classmethod
+    def get_session_id(cls):
+        return session.setdefault('session_id', uuid4().hex)
+
     @classmethod
     def get_session_tsne_plot_data(cls):
         return session.get('tsne_plot_data', {})
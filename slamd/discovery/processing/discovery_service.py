@@ -1,21 +1,33 @@
+from dataclasses import replace
 from datetime import datetime
 
 import numpy as np
 import pandas as pd
 from werkzeug.datastructures import CombinedMultiDict
 
-from slamd.common.error_handling import DatasetNotFoundException, PlotDataNotFoundException
-from slamd.common.slamd_utils import empty, float_if_not_empty
+from slamd.common.error_handling import DatasetNotFoundException, PlotDataNotFoundException, \
+    ExperimentJobNotFoundException, ValueNotSupportedException
+from slamd.common.slamd_utils import empty, float_if_not_empty, get_config_value
 from slamd.discovery.processing.discovery_persistence import DiscoveryPersistence
 from slamd.discovery.processing.experiment.experiment_conductor import ExperimentConductor
 from slamd.discovery.processing.experiment.experiment_data import ExperimentData
+from slamd.discovery.processing.experiment.experiment_job_pool import ExperimentJobPool, ExperimentJobError
+from slamd.discovery.processing.experiment.experiment_postprocessor import ExperimentPostprocessor
+from slamd.discovery.processing.experiment.experiment_preprocessor import ExperimentPreprocessor
 from slamd.discovery.processing.experiment.plot_generator import PlotGenerator
+from slamd.discovery.processing.experiment.tsne_embedding_cache import TSNEEmbeddingCache
 from slamd.discovery.processing.forms.discovery_form import DiscoveryForm
 from slamd.discovery.processing.forms.upload_dataset_form import UploadDatasetForm
+from slamd.discovery.processing.models.experiment_result import ExperimentResult
 from slamd.discovery.processing.models.prediction import Prediction
+from slamd.discovery.processing.models.prediction_page import PredictionPage
 from slamd.discovery.processing.strategies.csv_strategy import CsvStrategy
 from slamd.discovery.processing.strategies.excel_strategy import ExcelStrategy
 
+FIT_CONFIGURATION_KEYS = ['materials_data_input', 'target_properties', 'a_priori_information', 'model']
+PREDICTION_PAGE_SIZE = 50
+MAX_PREDICTION_PAGE_SIZE = 1000
+
 
 class DiscoveryService:
 
@@ -73,9 +85,88 @@ class DiscoveryService:
         experiment = cls._initialize_experiment(dataset.dataframe, request_body)
         df_with_predictions, scatter_plot, tsne_plot_data = ExperimentConductor.run(experiment)
 
-        prediction = Prediction(dataset_name, df_with_predictions, request_body)
+        prediction = Prediction(dataset_name, df_with_predictions, request_body,
+                                cls._create_experiment_result(experiment),
+                                cls._fingerprint_dataset(dataset.dataframe, request_body))
         DiscoveryPersistence.save_prediction(prediction)
-        DiscoveryPersistence.save_tsne_plot_data(tsne_plot_data)
+        cls._save_tsne_plot_data(tsne_plot_data)
+
+        return df_with_predictions, scatter_plot
+
+    @classmethod
+    def submit_experiment(cls, dataset_name, request_body):
+        """
+        Run the experiment in the background and return the id of its job.
+        """
+        dataset = DiscoveryPersistence.query_dataset_by_name(dataset_name)
+        if empty(dataset):
+            raise DatasetNotFoundException('Dataset with given name not found')
+
+        experiment = cls._initialize_experiment(dataset.dataframe, request_body)
+        return ExperimentJobPool.submit(experiment, dataset_name, request_body,
+                                        cls._fingerprint_dataset(dataset.dataframe, request_body),
+                                        DiscoveryPersistence.query_session_id())
+
+    @classmethod
+    def query_experiment_status(cls, job_id):
+        return ExperimentJobPool.status(cls._query_experiment_job(job_id))
+
+    @classmethod
+    def collect_experiment_result(cls, job_id):
+        """
+        Return the result of a finished job like run_experiment and save it as the current prediction.
+        Return None if the job is still queued or running.
+        """
+        job = cls._query_experiment_job(job_id)
+        if not job.future.done():
+            return None
+
+        ExperimentJobPool.remove_job(job_id)
+        try:
+            experiment, (df_with_predictions, scatter_plot, tsne_plot_data) = job.future.result()
+        except ExperimentJobError as error:
+            raise error.error_type(error.message)
+
+        prediction = Prediction(job.dataset_name, df_with_predictions, job.request_body,
+                                cls._create_experiment_result(experiment), job.dataset_fingerprint)
+        DiscoveryPersistence.save_prediction(prediction)
+        cls._save_tsne_plot_data(tsne_plot_data)
+
+        return df_with_predictions, scatter_plot
+
+    @classmethod
+    def _query_experiment_job(cls, job_id):
+        job = ExperimentJobPool.query_job(job_id, DiscoveryPersistence.query_session_id())
+        if empty(job):
+            raise ExperimentJobNotFoundException('Experiment with given id not found')
+        return job
+
+    @classmethod
+    def rescore_experiment(cls, dataset_name, request_body):
+        """
+        Rerank the last prediction with a new curiosity, weight, threshold and max_or_min configuration without fitting
+        the model again. If the stored prediction cannot be reused, i.e. if there is none, it belongs to another
+        dataset, the data has changed since or the new configuration affects the fit, the whole experiment is submitted
+        as a job instead and the id of the job is returned.
+        """
+        dataset = DiscoveryPersistence.query_dataset_by_name(dataset_name)
+        if empty(dataset):
+            raise DatasetNotFoundException('Dataset with given name not found')
+
+        prediction = DiscoveryPersistence.query_prediction()
+        experiment = None
+        if isinstance(prediction, Prediction) and prediction.dataset_used_for_prediction == dataset_name \
+                and not cls._fit_configuration_changed(prediction.metadata, request_body):
+            experiment = cls._restore_experiment(prediction, dataset.dataframe, request_body)
+        if experiment is None:
+            return cls.submit_experiment(dataset_name, request_body)
+
+        df_with_predictions, scatter_plot, tsne_plot_data = ExperimentConductor.rescore(experiment)
+
+        prediction = Prediction(dataset_name, df_with_predictions, request_body,
+                                cls._create_experiment_result(experiment), prediction.dataset_fingerprint)
+        DiscoveryPersistence.save_prediction(prediction)
+        cls._save_tsne_plot_data(tsne_plot_data)
 
         return df_with_predictions, scatter_plot
 
@@ -97,12 +188,114 @@ class DiscoveryService:
         if empty(dataset_of_prediction):
             raise DatasetNotFoundException('No dataset for the last prediction can be found')
 
+        if prediction.experiment_result is not None \
+                and len(prediction.dataframe) < len(prediction.experiment_result.utility):
+            # Only the top rows were put into the output table, create the complete table for the download
+            experiment = cls._restore_experiment(prediction, dataset_of_prediction.dataframe, prediction.metadata)
+            if experiment is not None:
+                prediction = replace(prediction, dataframe=ExperimentPostprocessor.create_output_table(experiment))
+
         output = ExcelStrategy.create_prediction_excel(dataset_of_prediction, prediction)
 
         return f'predictions-{dataset_of_prediction.name}-{datetime.now()}.xlsx', output
 
+    @classmethod
+    def query_prediction_page(cls, page=1, page_size=PREDICTION_PAGE_SIZE, sort_by=None, ascending=True, search=''):
+        prediction = DiscoveryPersistence.query_prediction()
+        if not prediction:
+            raise DatasetNotFoundException('No prediction can be found')
+
+        return cls.create_prediction_page(prediction.dataframe, page, page_size, sort_by, ascending, search)
+
+    @classmethod
+    def query_experiment_timings(cls):
+        """
+        Return the stage timings of the experiment behind the current prediction if they are configured to be shown
+        in the result view, otherwise None.
+        """
+        if not get_config_value('SHOW_EXPERIMENT_TIMINGS', False):
+            return None
+        prediction = DiscoveryPersistence.query_prediction()
+        if not prediction or prediction.experiment_result is None:
+            return None
+        return prediction.experiment_result.timings
+
+    @classmethod
+    def create_prediction_page(cls, dataframe, page=1, page_size=PREDICTION_PAGE_SIZE, sort_by=None, ascending=True,
+                               search=''):
+        """
+        Return one page of the prediction, optionally filtered by the rows containing the search term in any column and
+        sorted by the given column. The page is clamped to the last page of the filtered rows.
+        """
+        if page < 1 or not 1 <= page_size <= MAX_PREDICTION_PAGE_SIZE:
+            raise ValueNotSupportedException(f'Page must be at least 1 and page size between 1 and '
+                                             f'{MAX_PREDICTION_PAGE_SIZE}')
+        if sort_by is not None and sort_by not in dataframe.columns:
+            raise ValueNotSupportedException(f'Cannot sort by unknown column {sort_by}')
+
+        filtered = dataframe
+        if search:
+            contains_search = np.zeros(len(dataframe), dtype=bool)
+            for column in dataframe.columns:
+                contains_search |= dataframe[column].astype(str).str.contains(search, case=False, regex=False)\
+                    .to_numpy()
+            filtered = dataframe[contains_search]
+
+        if sort_by is not None:
+            filtered = filtered.sort_values(by=sort_by, ascending=ascending, kind='stable', na_position='last')
+
+        page = min(page, max(1, -(-len(filtered) // page_size)))
+        rows = filtered.iloc[(page - 1) * page_size:page * page_size]
+        # Missing values are sent as null
+        rows = rows.astype(object).where(rows.notna(), None).values.tolist()
+
+        return PredictionPage(columns=list(dataframe.columns), rows=rows, page=page, page_size=page_size,
+                              total_rows=len(dataframe), filtered_rows=len(filtered), sort_by=sort_by,
+                              ascending=ascending, search=search)
+
     @classmethod
     def _initialize_experiment(cls, dataframe, request_body):
+        return ExperimentData(
+            dataframe=dataframe,
+            model=request_body['model'],
+            feature_names=request_body['materials_data_input'],
+            target_names=request_body['target_properties'],
+            apriori_names=request_body['a_priori_information'],
+            **cls._parse_scoring_configuration(request_body)
+        )
+
+    @classmethod
+    def _create_experiment_result(cls, experiment):
+        return ExperimentResult(prediction=experiment.prediction, uncertainty=experiment.uncertainty,
+                                utility=experiment.utility, novelty=experiment.novelty,
+                                orig_index=experiment.orig_index, timings=experiment.timings)
+
+    @classmethod
+    def _restore_experiment(cls, prediction, dataframe, request_body):
+        """
+        Rebuild the experiment of the stored prediction from its dataset with the given configuration, which must not
+        affect the fit, and reuse the stored outputs instead of fitting the model again. Return None if the dataset has
+        changed since or the prediction has no stored result.
+        """
+        experiment_result = prediction.experiment_result
+        if experiment_result is None \
+                or prediction.dataset_fingerprint != cls._fingerprint_dataset(dataframe, request_body):
+            return None
+
+        experiment = cls._initialize_experiment(dataframe, request_body)
+        ExperimentPreprocessor.preprocess(experiment)
+        if not experiment.orig_index.equals(experiment_result.orig_index):
+            return None
+
+        experiment.prediction = experiment_result.prediction
+        experiment.uncertainty = experiment_result.uncertainty
+        experiment.utility = experiment_result.utility
+        experiment.novelty = experiment_result.novelty
+        experiment.timings = experiment_result.timings
+        return experiment
+
+    @classmethod
+    def _parse_scoring_configuration(cls, request_body):
         target_weights = [float(conf['weight']) for conf in request_body['target_configurations']]
         target_thresholds = [float_if_not_empty(conf['threshold']) for conf in request_body['target_configurations']]
         target_max_or_min = [conf['max_or_min'] for conf in request_body['target_configurations']]
@@ -112,22 +305,36 @@ class DiscoveryService:
                               for conf in request_body['a_priori_information_configurations']]
         apriori_max_or_min = [conf['max_or_min'] for conf in request_body['a_priori_information_configurations']]
 
-        return ExperimentData(
-            dataframe=dataframe,
-            model=request_body['model'],
-            curiosity=float(request_body['curiosity']),
-            feature_names=request_body['materials_data_input'],
+        return {
+            'curiosity': float(request_body['curiosity']),
 
-            target_names=request_body['target_properties'],
-            target_weights=target_weights,
-            target_thresholds=target_thresholds,
-            target_max_or_min=target_max_or_min,
+            'target_weights': target_weights,
+            'target_thresholds': target_thresholds,
+            'target_max_or_min': target_max_or_min,
 
-            apriori_names=request_body['a_priori_information'],
-            apriori_weights=apriori_weights,
-            apriori_thresholds=apriori_thresholds,
-            apriori_max_or_min=apriori_max_or_min,
-        )
+            'apriori_weights': apriori_weights,
+            'apriori_thresholds': apriori_thresholds,
+            'apriori_max_or_min': apriori_max_or_min,
+        }
+
+    @classmethod
+    def _fit_configuration_changed(cls, previous_request_body, request_body):
+        # A priori thresholds filter rows before fitting, whereas target thresholds only clip the prediction
+        return any(previous_request_body[key] != request_body[key] for key in FIT_CONFIGURATION_KEYS) or \
+            cls._apriori_row_filter(previous_request_body) != cls._apriori_row_filter(request_body)
+
+    @classmethod
+    def _apriori_row_filter(cls, request_body):
+        # The direction of an a priori column only matters for filtering rows if it has a threshold
+        configuration = cls._parse_scoring_configuration(request_body)
+        return [(threshold, max_or_min if threshold is not None else None) for (threshold, max_or_min)
+                in zip(configuration['apriori_thresholds'], configuration['apriori_max_or_min'])]
+
+    @classmethod
+    def _fingerprint_dataset(cls, dataframe, request_body):
+        columns = request_body['materials_data_input'] + request_body['target_properties'] + \
+            request_body['a_priori_information']
+        return int(pd.util.hash_pandas_object(dataframe[columns]).sum())
 
     @classmethod
     def create_tsne_plot(cls):
@@ -135,10 +342,7 @@ class DiscoveryService:
         if not tsne_plot_data:
             raise PlotDataNotFoundException('Cannot find data to create TSNE plot!')
 
-        plot_df = tsne_plot_data.features_df.copy()
-        features_std = plot_df.std().replace(0, 1)
-        features_mean = plot_df.mean()
-        plot_df = (plot_df - features_mean) / features_std
+        plot_df = cls._normalize_tsne_features(tsne_plot_data.features_df)
 
         plot_df['is_train_data'] = 'Predicted'
         plot_df.loc[tsne_plot_data.index_all_labelled, 'is_train_data'] = 'Labelled'
@@ -155,3 +359,15 @@ class DiscoveryService:
         plot_df.insert(loc=0, column='Row number', value=list(range(1, len(plot_df) + 1)))
 
         return PlotGenerator.create_tsne_input_space_plot(plot_df)
+
+    @classmethod
+    def _save_tsne_plot_data(cls, tsne_plot_data):
+        DiscoveryPersistence.save_tsne_plot_data(tsne_plot_data)
+        # Start embedding the features now, so that the plot is ready by the time the user opens it
+        TSNEEmbeddingCache.compute_in_background(cls._normalize_tsne_features(tsne_plot_data.features_df))
+
+    @classmethod
+    def _normalize_tsne_features(cls, features_df):
+        features_std = features_df.std().replace(0, 1)
+        features_mean = features_df.mean()
+        return (features_df - features_mean) / features_std
@@ -1,68 +1,227 @@
 # Adapted from the original Sequential Learning App
 # https://github.com/BAMresearch/SequentialLearningApp
+import atexit
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from threading import Lock
+
 import numpy as np
 import pandas as pd
-from scipy.spatial import distance_matrix
+from scipy.spatial import cKDTree, distance_matrix
 from sklearn.exceptions import ConvergenceWarning
 
 from slamd.common.error_handling import SequentialLearningException
+from slamd.common.slamd_utils import get_config_value, export_config, init_worker_config
 from slamd.discovery.processing.experiment.experiment_postprocessor import ExperimentPostprocessor
 from slamd.discovery.processing.experiment.experiment_preprocessor import ExperimentPreprocessor
 from slamd.discovery.processing.experiment.mlmodel.mlmodel_factory import MLModelFactory
+from slamd.discovery.processing.experiment.prediction_cache import PredictionCache
+from slamd.discovery.processing.experiment.stage_timer import create_stage_timing, log_stage_timings, measure_stage, \
+    start_stage
 
 # Attention - suppressing expected Gaussian Regressor warnings
 warnings.filterwarnings('ignore', category=ConvergenceWarning)
 
+# Above this number of features, nearest neighbour queries fall back to a chunked brute force search
+KDTREE_MAX_DIMENSIONS = 16
+NOVELTY_CHUNK_SIZE = 1024
+
+# Configuration read while running an experiment, which is sent to the worker processes
+WORKER_CONFIG_KEYS = ['EXPERIMENT_FIT_WORKERS', 'EXPERIMENT_SHARED_FIT', 'GP_INCREMENTAL_FIT',
+                      'GP_INCREMENTAL_LML_TOLERANCE', 'GP_RESTART_TOLERANCE', 'GP_RESTART_WORKERS', 'LOLOPY_JVM_MEMORY',
+                      'LOLOPY_JVM_THREADS', 'OUTPUT_TABLE_TOP_K', 'PREDICTION_CACHE_MAX_BYTES',
+                      'TSNE_BACKGROUND_EMBEDDING', 'TSNE_CACHE_MAX_ENTRIES']
+
+
+def init_experiment_worker(config):
+    """
+    Initialise a worker process with the app configuration. Workers fit their targets in-process: a process started by
+    multiprocessing joins its children before exiting, so a nested pool of fit workers would keep it alive forever.
+    The lolopy gateway is only started once a worker receives a random forest, see PicklableLoloMixin.
+    """
+    init_worker_config({**config, 'EXPERIMENT_FIT_WORKERS': 1})
+
+
+def create_experiment_executor(max_workers):
+    """
+    Create a pool of worker processes for running experiments or fitting their targets, initialised with the app
+    configuration.
+    """
+    # Spawn fresh interpreters: forked children would share the parent's py4j connection to the lolopy JVM
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context('spawn'),
+                               initializer=init_experiment_worker, initargs=(export_config(WORKER_CONFIG_KEYS),))
+
+
+def fit_and_predict_target(regressor, training_rows, training_labels, rows_to_predict):
+    """
+    Fit the regressor for one or several targets and predict the remaining rows. Defined on module level so that it can
+    be sent to the worker processes when the targets are fitted in parallel. Return the prediction, the uncertainty and
+    the timings of the fit and the prediction, measured in the process which ran them.
+    """
+    start = start_stage()
+    regressor.fit(training_rows, training_labels)
+    timings = [create_stage_timing('fit', start, rows=len(training_rows))]
+
+    start = start_stage()
+    prediction, uncertainty = regressor.predict(rows_to_predict, return_std=True)
+    timings.append(create_stage_timing('predict', start, rows=len(rows_to_predict)))
+    return prediction, uncertainty, timings
+
 
 class ExperimentConductor:
+    # Worker processes for fitting the targets in parallel. They are kept for the lifetime of the app, so that the
+    # interpreter, JVM and library startup as well as the previous fits of the incremental GP are shared by all runs.
+    _fit_executor = None
+    _fit_executor_lock = Lock()
 
     @classmethod
     def run(cls, exp):
-        ExperimentPreprocessor.preprocess(exp)
-        cls._fit_model_and_predict(exp)
-        cls._calculate_utility(exp)
-        cls._calculate_novelty(exp)
+        exp.timings = []
+        with measure_stage(exp.timings, 'preprocess'):
+            ExperimentPreprocessor.preprocess(exp)
+
+        # Changes to curiosity, weights or thresholds do not require fitting the model again
+        cache_key = PredictionCache.create_key(exp)
+        if not PredictionCache.load(cache_key, exp):
+            cls._fit_model_and_predict(exp)
+            PredictionCache.save(cache_key, exp)
+
+        with measure_stage(exp.timings, 'utility'):
+            cls._calculate_utility(exp)
+        with measure_stage(exp.timings, 'novelty'):
+            cls._calculate_novelty(exp)
+
+        result = ExperimentPostprocessor.postprocess(exp)
+        log_stage_timings(exp.timings, operation='run', model=exp.model, rows=len(exp.dataframe),
+                          targets=len(exp.target_names))
+        return result
 
-        return ExperimentPostprocessor.postprocess(exp)
+    @classmethod
+    def rescore(cls, exp):
+        """
+        Recompute the utility of a finished experiment after its curiosity, weights, thresholds or max_or_min
+        configuration has changed. Predictions, uncertainties and novelty are reused as they are.
+        """
+        exp.timings = []
+        with measure_stage(exp.timings, 'utility'):
+            cls._calculate_utility(exp)
+
+        result = ExperimentPostprocessor.postprocess(exp)
+        log_stage_timings(exp.timings, operation='rescore', model=exp.model, rows=len(exp.dataframe),
+                          targets=len(exp.target_names))
+        return result
 
     @classmethod
     def _fit_model_and_predict(cls, exp):
-        regressor = MLModelFactory.initialize_model(exp)
-
         predictions = pd.DataFrame(columns=exp.target_names, index=exp.index_predicted, dtype=np.float64)
         uncertainties = pd.DataFrame(columns=exp.target_names, index=exp.index_predicted, dtype=np.float64)
-        for target in exp.target_names:
-            # Train the model for every target with the corresponding rows and labels
-            index_labelled = exp.targets_df.index[exp.targets_df[target].notnull()]
-            index_unlabelled = exp.targets_df.index[exp.targets_df[target].isnull()]
 
-            training_rows = exp.features_df.loc[index_labelled].values
-            training_labels = exp.targets_df.loc[index_labelled, target].values.reshape(-1, 1)
+        # Each fit is described by the targets it covers, the rows it is trained on and the rows it predicts
+        fits = []
+        shared_fit_targets = cls._select_targets_for_shared_fit(exp)
+        if shared_fit_targets:
+            # Fit one multi-output model on the rows which are labelled for all of these targets
+            with measure_stage(exp.timings, 'create_model', targets=shared_fit_targets):
+                shared_model = MLModelFactory.initialize_shared_model(exp)
+            fits.append((shared_fit_targets, shared_model, exp.index_all_labelled, exp.index_predicted))
+
+        separate_fit_targets = [target for target in exp.target_names if target not in shared_fit_targets]
+        if separate_fit_targets:
+            # The tuned models search their hyperparameters when they are created
+            with measure_stage(exp.timings, 'create_model', targets=separate_fit_targets):
+                regressor = MLModelFactory.initialize_model(exp)
+            for target in separate_fit_targets:
+                # Train the model for every target with the corresponding rows and labels
+                index_labelled = exp.targets_df.index[exp.targets_df[target].notnull()]
+                index_unlabelled = exp.targets_df.index[exp.targets_df[target].isnull()]
+                fits.append(([target], regressor, index_labelled, index_unlabelled))
+
+        fit_args = [
+            (model,
+             exp.features_df.loc[index_labelled].values,
+             exp.targets_df.loc[index_labelled, targets].values,
+             exp.features_df.loc[index_unlabelled].values)
+            for (targets, model, index_labelled, index_unlabelled) in fits
+        ]
+
+        workers = min(get_config_value('EXPERIMENT_FIT_WORKERS', 1), len(fits))
+        try:
+            if workers > 1:
+                results = cls._fit_and_predict_in_parallel(fit_args)
+            else:
+                results = [fit_and_predict_target(*args) for args in fit_args]
+        except Exception:
+            raise SequentialLearningException(message=f'There was an unknown error while trying to fit '
+                                                      f'the regressor using {exp.model}. Please verify '
+                                                      f'your dataset.')
+
+        for (fit, (prediction, uncertainty, fit_timings)) in zip(fits, results):
+            (targets, _, index_labelled, index_unlabelled) = fit
+            exp.timings.extend({**timing, 'targets': targets} for timing in fit_timings)
+            prediction = np.asarray(prediction).reshape(len(index_unlabelled), len(targets))
+            uncertainty = np.asarray(uncertainty).reshape(len(index_unlabelled), len(targets))
+
+            for (i, target) in enumerate(targets):
+                predictions.loc[index_unlabelled, target] = prediction[:, i]
+                uncertainties.loc[index_unlabelled, target] = uncertainty[:, i]
+
+                # Determine rows for which the current target is labelled, but others aren't
+                index_only_curr_labelled = exp.index_partially_labelled.intersection(index_labelled)
+
+                # Add these known values to the prediction with uncertainty 0, for the utility calculation
+                predictions.loc[index_only_curr_labelled, target] = exp.targets_df.loc[index_only_curr_labelled,
+                                                                                       target]
+                uncertainties.loc[index_only_curr_labelled, target] = 0
 
-            try:
-                regressor.fit(training_rows, training_labels)
-            except:
-                raise SequentialLearningException(message=f'There was an unknown error while trying to fit '
-                                                          f'the regressor using {exp.model}. Please verify '
-                                                          f'your dataset.')
+        exp.prediction = predictions
+        exp.uncertainty = uncertainties
 
-            # Predict the label for the remaining rows
-            rows_to_predict = exp.features_df.loc[index_unlabelled].values
-            prediction, uncertainty = regressor.predict(rows_to_predict, return_std=True)
+    @classmethod
+    def _select_targets_for_shared_fit(cls, exp):
+        """
+        Return the targets which can be learned by a single multi-output model, i.e. the targets which are only
+        labelled in rows where all other targets are labelled as well. Targets with additional labels in partially
+        labelled rows are fitted separately so that none of their labels are lost.
+        """
+        if not get_config_value('EXPERIMENT_SHARED_FIT', False) or not MLModelFactory.supports_shared_model(exp):
+            return []
 
-            predictions.loc[index_unlabelled, target] = prediction
-            uncertainties.loc[index_unlabelled, target] = uncertainty
+        targets = [target for target in exp.target_names
+                   if exp.targets_df[target].count() == len(exp.index_all_labelled)]
+        return targets if len(targets) > 1 else []
 
-            # Determine rows for which the current target is labelled, but others aren't
-            index_only_curr_labelled = exp.index_partially_labelled.intersection(index_labelled)
+    @classmethod
+    def _fit_and_predict_in_parallel(cls, fit_args):
+        executor = cls._get_fit_executor()
+        try:
+            futures = [executor.submit(fit_and_predict_target, *args) for args in fit_args]
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            # A worker died, e.g. it ran out of memory. Start a new pool for the next experiment.
+            with cls._fit_executor_lock:
+                if cls._fit_executor is executor:
+                    cls._fit_executor = None
+            raise
 
-            # Add these known values to the prediction with uncertainty 0, for the utility calculation
-            predictions.loc[index_only_curr_labelled, target] = exp.targets_df.loc[index_only_curr_labelled, target]
-            uncertainties.loc[index_only_curr_labelled, target] = 0
+    @classmethod
+    def _get_fit_executor(cls):
+        with cls._fit_executor_lock:
+            if cls._fit_executor is None:
+                cls._fit_executor = create_experiment_executor(get_config_value('EXPERIMENT_FIT_WORKERS', 1))
+            return cls._fit_executor
 
-        exp.prediction = predictions
-        exp.uncertainty = uncertainties
+    @classmethod
+    def shutdown_fit_executor(cls):
+        """
+        Stop the worker processes of the fit pool. Runs at exit, so that idle workers do not block the shutdown of the
+        app.
+        """
+        with cls._fit_executor_lock:
+            executor, cls._fit_executor = cls._fit_executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
 
     @classmethod
     def _calculate_utility(cls, exp):
@@ -81,61 +240,50 @@ class ExperimentConductor:
         prediction_for_utility, uncertainty_for_utility = cls._process_predictions(exp)
         apriori_for_utility = cls._process_apriori(exp)
 
-        exp.utility = apriori_for_utility + prediction_for_utility.sum(axis=1) + \
-            exp.curiosity * uncertainty_for_utility.sum(axis=1)
+        exp.utility = pd.Series(apriori_for_utility + prediction_for_utility + exp.curiosity * uncertainty_for_utility,
+                                index=exp.prediction.index)
 
     @classmethod
     def _process_predictions(cls, exp):
-        # Clip, norm, and weigh predictions for utility calculation
+        # Clip, norm, and weigh predictions for utility calculation and return their sums per row
         # Targets which should be minimized instead of maximized are also inverted for the utility calculation
+        # Thresholds, signs and weights are vectors over the targets which are broadcast over all rows at once
 
         # Clip
-        clipped_prediction = cls.clip_prediction(exp)
+        clipped_prediction = cls.clip_prediction(exp).to_numpy()
 
         # Norm - use 1 as standard deviation instead of 0 to avoid division by 0 (unlikely)
-        labels_std = exp.targets_df.std(skipna=True).replace(0, 1)
-        labels_mean = exp.targets_df.mean(skipna=True)
-        normed_uncertainty = exp.uncertainty / labels_std
+        labels_std = exp.targets_df.std(skipna=True).replace(0, 1).to_numpy()
+        labels_mean = exp.targets_df.mean(skipna=True).to_numpy()
+        normed_uncertainty = exp.uncertainty.to_numpy(dtype=np.float64) / labels_std
         normed_prediction = (clipped_prediction - labels_mean) / labels_std
 
-        # Invert
-        for (column, value) in zip(exp.target_names, exp.target_max_or_min):
-            if value == 'min':
-                normed_prediction[column] *= (-1)
+        # Invert and weigh
+        weights = np.array(exp.target_weights, dtype=np.float64)
+        signs = np.where(np.array(exp.target_max_or_min) == 'min', -1.0, 1.0)
 
-        # Weigh
-        for (target, weight) in zip(exp.target_names, exp.target_weights):
-            normed_prediction[target] *= weight
-            normed_uncertainty[target] *= weight
-
-        return normed_prediction, normed_uncertainty
+        # Like DataFrame.sum, treat missing values as 0
+        return np.nansum(normed_prediction * (signs * weights), axis=1), np.nansum(normed_uncertainty * weights, axis=1)
 
     @classmethod
     def _process_apriori(cls, exp):
-        # Norm, weigh and if necessary invert apriori columns for utility calculation
+        # Norm, weigh and if necessary invert apriori columns for utility calculation and return their sums per row
 
         if len(exp.apriori_names) == 0:
             # Return plain 0 instead of array - numpy broadcasting will take care of it
             return 0
 
         # Norm - use 1 as standard deviation instead of 0 to avoid division by 0
-        normed_apriori_df = exp.apriori_df.copy()
-        apriori_std = normed_apriori_df.std().replace(0, 1)
-        apriori_mean = normed_apriori_df.mean()
-        normed_apriori_df = (normed_apriori_df - apriori_mean) / apriori_std
-
-        apriori_for_predicted_rows = normed_apriori_df.loc[exp.index_predicted]
-
-        # Invert
-        for (column, value) in zip(exp.apriori_names, exp.apriori_max_or_min):
-            if value == 'min':
-                apriori_for_predicted_rows[column] *= (-1)
+        apriori_std = exp.apriori_df.std().replace(0, 1).to_numpy()
+        apriori_mean = exp.apriori_df.mean().to_numpy()
+        apriori_for_predicted_rows = exp.apriori_df.loc[exp.prediction.index].to_numpy(dtype=np.float64)
+        normed_apriori = (apriori_for_predicted_rows - apriori_mean) / apriori_std
 
-        # Weigh
-        for (col, weight) in zip(exp.apriori_df.columns, exp.apriori_weights):
-            apriori_for_predicted_rows[col] *= weight
+        # Invert and weigh
+        weights = np.array(exp.apriori_weights, dtype=np.float64)
+        signs = np.where(np.array(exp.apriori_max_or_min) == 'min', -1.0, 1.0)
 
-        return apriori_for_predicted_rows.sum(axis=1)
+        return np.nansum(normed_apriori * (signs * weights), axis=1)
 
     @classmethod
     def _calculate_novelty(cls, exp):
@@ -158,8 +306,8 @@ class ExperimentConductor:
         features_of_predicted_rows = norm_features_df.loc[exp.index_predicted]
         features_of_known_rows = norm_features_df.loc[exp.index_all_labelled]
 
-        distance = distance_matrix(features_of_predicted_rows, features_of_known_rows)
-        min_distances = distance.min(axis=1)
+        min_distances = cls._nearest_neighbour_distances(features_of_predicted_rows.values,
+                                                         features_of_known_rows.values)
         max_of_min_distances = min_distances.max()
 
         novelty_as_array = min_distances * (1 / max_of_min_distances)
@@ -170,15 +318,30 @@ class ExperimentConductor:
         )
 
     @classmethod
-    def clip_prediction(cls, exp):
-        clipped_prediction = exp.prediction.copy()
-        for (target, max_or_min, threshold) in zip(exp.target_names, exp.target_max_or_min, exp.target_thresholds):
-            if threshold is None:
-                continue
+    def _nearest_neighbour_distances(cls, points, reference_points):
+        """
+        Return the Euclidean distance from every point to its nearest reference point without allocating the full
+        distance matrix. A KD-tree is used for low-dimensional data. In higher dimensions its queries degrade to brute
+        force anyway, so the minimum is reduced chunk by chunk instead.
+        """
+        if points.shape[1] <= KDTREE_MAX_DIMENSIONS:
+            distances, _ = cKDTree(reference_points).query(points, k=1)
+            return distances
 
-            if max_or_min == 'min':
-                clipped_prediction[target] = clipped_prediction[target].clip(lower=threshold)
-            else:
-                clipped_prediction[target] = clipped_prediction[target].clip(upper=threshold)
+        return np.concatenate([
+            distance_matrix(points[start:start + NOVELTY_CHUNK_SIZE], reference_points).min(axis=1)
+            for start in range(0, len(points), NOVELTY_CHUNK_SIZE)
+        ])
 
-        return clipped_prediction
+    @classmethod
+    def clip_prediction(cls, exp):
+        # Targets to be maximized are clipped from above and targets to be minimized from below at their thresholds
+        minimize = np.array(exp.target_max_or_min) == 'min'
+        thresholds = np.array([np.nan if threshold is None else threshold for threshold in exp.target_thresholds],
+                              dtype=np.float64)
+        lower = np.where(minimize & ~np.isnan(thresholds), thresholds, -np.inf)
+        upper = np.where(~minimize & ~np.isnan(thresholds), thresholds, np.inf)
+        return pd.DataFrame(np.clip(exp.prediction.to_numpy(dtype=np.float64), lower, upper),
+                            index=exp.prediction.index, columns=exp.prediction.columns)
+
+atexit.register(ExperimentConductor.shutdown_fit_executor)
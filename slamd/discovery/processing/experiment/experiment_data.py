@@ -23,40 +23,91 @@ class ExperimentData:
 
     labelled_index: Index = None
     unlabelled_index: Index = None
+    # Labels of the rows of orig_data which correspond to the rows of dataframe
+    orig_index: Index = None
 
     prediction: DataFrame = None
     uncertainty: DataFrame = None
     utility: DataFrame = None
     novelty: DataFrame = None
 
+    # Duration and peak memory of the stages of the last run, see stage_timer
+    timings: list[dict] = field(default_factory=list, repr=False, compare=False)
+
+    # Column projections and label indexes derived from dataframe, see invalidate_cache
+    _cache: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
     def __post_init__(self):
-        self.orig_data = self.dataframe.copy()
-        self.dataframe = self.dataframe.copy()  # otherwise, dataset object in session gets overwritten
+        # orig_data is the uploaded dataset and must not be changed, it is only read when building the output table.
+        # Only the columns used by the experiment are copied into dataframe, which the preprocessor modifies in place.
+        self.orig_data = self.dataframe
+        used_columns = set(self.feature_names + self.target_names + self.apriori_names)
+        self.dataframe = self.dataframe.reindex(
+            columns=[column for column in self.dataframe.columns if column in used_columns])
+        self.orig_index = self.dataframe.index
+
+    @property
+    def orig_data_of_predicted_rows(self):
+        """
+        Return all columns of the uploaded dataset for the predicted rows, indexed like dataframe.
+        """
+        return self.orig_data_of_rows(self.index_predicted)
+
+    def orig_data_of_rows(self, index):
+        """
+        Return all columns of the uploaded dataset for the given rows of dataframe, in the given order.
+        """
+        orig_data = self.orig_data.loc[self.orig_index[self.dataframe.index.get_indexer(index)]]
+        orig_data.index = index
+        return orig_data
+
+    def __getstate__(self):
+        # The cache only holds derived data, do not store it in the session or send it to worker processes
+        state = self.__dict__.copy()
+        state['_cache'] = {}
+        return state
+
+    def invalidate_cache(self):
+        """
+        The column projections and label indexes are computed once and then reused by all stages of the experiment.
+        Call this after changing dataframe or the column names in place.
+        """
+        self._cache.clear()
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
 
     @property
     def features_df(self):
-        return self.dataframe[self.feature_names]
+        return self._cached('features_df', lambda: self.dataframe[self.feature_names])
 
     @property
     def targets_df(self):
-        return self.dataframe[self.target_names]
+        return self._cached('targets_df', lambda: self.dataframe[self.target_names])
 
     @property
     def apriori_df(self):
-        return self.dataframe[self.apriori_names]
+        return self._cached('apriori_df', lambda: self.dataframe[self.apriori_names])
 
     @property
     def index_none_labelled(self):
-        return self.dataframe.index[self.targets_df.isnull().all(axis=1)]
+        return self._cached('index_none_labelled',
+                            lambda: self.dataframe.index[self.targets_df.isnull().all(axis=1)])
 
     @property
     def index_partially_labelled(self):
-        return self.dataframe.index.difference(self.index_all_labelled).difference(self.index_none_labelled)
+        return self._cached('index_partially_labelled',
+                            lambda: self.dataframe.index.difference(self.index_all_labelled).difference(
+                                self.index_none_labelled))
 
     @property
     def index_all_labelled(self):
-        return self.dataframe.index[self.targets_df.notnull().all(axis=1)]
+        return self._cached('index_all_labelled',
+                            lambda: self.dataframe.index[self.targets_df.notnull().all(axis=1)])
 
     @property
     def index_predicted(self):
-        return self.index_none_labelled.union(self.index_partially_labelled)
+        return self._cached('index_predicted',
+                            lambda: self.index_none_labelled.union(self.index_partially_labelled))
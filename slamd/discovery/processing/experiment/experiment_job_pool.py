@@ -0,0 +1,118 @@
+import time
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+
+from werkzeug.exceptions import HTTPException
+
+from slamd.common.slamd_utils import get_config_value
+from slamd.discovery.processing.experiment.experiment_conductor import ExperimentConductor, create_experiment_executor
+from slamd.discovery.processing.models.experiment_job import ExperimentJob
+
+QUEUED = 'queued'
+RUNNING = 'running'
+FINISHED = 'finished'
+FAILED = 'failed'
+
+
+class ExperimentJobError(Exception):
+    """
+    Carries the type and message of an exception raised while running an experiment in a worker process. Our HTTP
+    exceptions require a message argument and can therefore not be unpickled in the app process themselves.
+    """
+
+    def __init__(self, error_type, message):
+        super().__init__(error_type, message)
+        self.error_type = error_type
+        self.message = message
+
+
+def run_experiment_job(exp):
+    """
+    Run the experiment in a worker process. Returns the experiment as well, since its state is needed to rescore it.
+    """
+    try:
+        return exp, ExperimentConductor.run(exp)
+    except HTTPException as error:
+        raise ExperimentJobError(type(error), getattr(error, 'message', error.description))
+
+
+class ExperimentJobPool:
+    """
+    Runs experiments in a pool of worker processes so that long model fits do not block the web workers. Jobs are kept
+    in memory of the app process until their result has been collected by the session which submitted them, or until
+    they have been finished for longer than EXPERIMENT_JOB_TTL seconds.
+
+    As the jobs live in the memory of one app process, the app must be served by a single process: requests polling a
+    job on another gunicorn worker would not find it. Scale with threads instead of workers (see Procfile).
+    """
+
+    _executor = None
+    _jobs = {}
+    _lock = Lock()
+
+    @classmethod
+    def submit(cls, exp, dataset_name, request_body, dataset_fingerprint, owner):
+        job = ExperimentJob(str(uuid.uuid4()), dataset_name, request_body, dataset_fingerprint, owner=owner)
+        job.future = cls._submit_to_executor(run_experiment_job, exp)
+        job.future.add_done_callback(lambda _: setattr(job, 'finished_at', time.monotonic()))
+
+        with cls._lock:
+            cls._evict_expired_jobs()
+            cls._jobs[job.job_id] = job
+        return job.job_id
+
+    @classmethod
+    def query_job(cls, job_id, owner):
+        """
+        Return the job with the given id or None if there is no such job or it was submitted by another owner.
+        """
+        with cls._lock:
+            cls._evict_expired_jobs()
+            job = cls._jobs.get(job_id)
+        if job is None or job.owner != owner:
+            return None
+        return job
+
+    @classmethod
+    def remove_job(cls, job_id):
+        with cls._lock:
+            cls._jobs.pop(job_id, None)
+
+    @classmethod
+    def status(cls, job):
+        if job.future.running():
+            return RUNNING
+        if not job.future.done():
+            return QUEUED
+        return FAILED if job.future.exception() is not None else FINISHED
+
+    @classmethod
+    def _evict_expired_jobs(cls):
+        """
+        Remove the jobs whose result has not been collected within EXPERIMENT_JOB_TTL seconds after they finished.
+        Must be called while holding the lock.
+        """
+        expired_before = time.monotonic() - get_config_value('EXPERIMENT_JOB_TTL', 3600)
+        for job_id in [job_id for (job_id, job) in cls._jobs.items()
+                       if job.finished_at is not None and job.finished_at < expired_before]:
+            del cls._jobs[job_id]
+
+    @classmethod
+    def _submit_to_executor(cls, fn, *args):
+        executor = cls._get_executor()
+        try:
+            return executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died, e.g. it ran out of memory. Retry once with a new pool.
+            with cls._lock:
+                if cls._executor is executor:
+                    cls._executor = None
+            return cls._get_executor().submit(fn, *args)
+
+    @classmethod
+    def _get_executor(cls):
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = create_experiment_executor(get_config_value('EXPERIMENT_JOB_WORKERS', 1))
+            return cls._executor
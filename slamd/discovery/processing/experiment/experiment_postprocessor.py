@@ -1,4 +1,8 @@
+import numpy as np
+
+from slamd.common.slamd_utils import get_config_value
 from slamd.discovery.processing.experiment.plot_generator import PlotGenerator
+from slamd.discovery.processing.experiment.stage_timer import measure_stage
 from slamd.discovery.processing.models.tsne_plot_data import TSNEPlotData
 
 
@@ -6,26 +10,54 @@ class ExperimentPostprocessor:
 
     @classmethod
     def postprocess(cls, exp):
-        # Construct dataframe for output
+        # With OUTPUT_TABLE_TOP_K set, only the rows with the highest utility are put into the output table.
+        # The complete table can be created with create_output_table when it is downloaded.
+        with measure_stage(exp.timings, 'output_table'):
+            df = cls.create_output_table(exp, get_config_value('OUTPUT_TABLE_TOP_K', None))
+        with measure_stage(exp.timings, 'scatter_plot'):
+            scatter_plot = cls.plot_output_space(df, exp)
+
+        tsne_plot_data = TSNEPlotData(utility=exp.utility, features_df=exp.features_df,
+                                      index_all_labelled=exp.index_all_labelled,
+                                      index_none_labelled=exp.index_none_labelled,
+                                      index_partially_labelled=exp.index_partially_labelled)
+        return df, scatter_plot, tsne_plot_data
+
+    @classmethod
+    def create_output_table(cls, exp, top_k=None):
+        """
+        Construct the dataframe for output, sorted by Utility in decreasing order. If top_k is given, only the top_k
+        rows with the highest utility are selected, without sorting the other rows, and only these rows are copied from
+        the uploaded dataset.
+        """
+        utility = exp.utility.round(6)
+        index = cls.select_rows_by_utility(utility, top_k)
 
-        df = exp.orig_data.loc[exp.index_predicted].copy()
+        df = exp.orig_data_of_rows(index)
         # Add the columns with utility and novelty values
-        df['Utility'] = exp.utility.round(6)
+        df['Utility'] = utility.loc[index]
         if exp.novelty is not None:
-            df['Novelty'] = exp.novelty.round(6)
+            df['Novelty'] = exp.novelty.loc[index].round(6)
 
         for target in exp.target_names:
-            df[target] = exp.prediction[target].round(6)
-            df[f'Uncertainty ({target})'] = exp.uncertainty[target].round(5)
+            df[target] = exp.prediction.loc[index, target].round(6)
+            df[f'Uncertainty ({target})'] = exp.uncertainty.loc[index, target].round(5)
 
-        df = cls.process_dataframe_for_output_table(df, exp)
-        scatter_plot = cls.plot_output_space(df, exp)
+        return cls.process_dataframe_for_output_table(df, exp)
 
-        tsne_plot_data = TSNEPlotData(utility=exp.utility, features_df=exp.features_df,
-                                      index_all_labelled=exp.index_all_labelled,
-                                      index_none_labelled=exp.index_none_labelled,
-                                      index_partially_labelled=exp.index_partially_labelled)
-        return df, scatter_plot, tsne_plot_data
+    @classmethod
+    def select_rows_by_utility(cls, utility, top_k=None):
+        """
+        Return the index of the rows in decreasing order of utility, restricted to the top_k rows if given.
+        """
+        values = -utility.to_numpy()
+        if top_k is None or top_k >= len(values):
+            return utility.index[np.argsort(values, kind='stable')]
+
+        # Partial selection of the top_k rows in linear time, then sort only those. Rows with the same utility keep
+        # the order of the dataset, as in the complete table.
+        positions = np.sort(np.argpartition(values, top_k - 1)[:top_k])
+        return utility.index[positions[np.argsort(values[positions], kind='stable')]]
 
     @classmethod
     def move_after_row_column(cls, df, cols_to_move):
@@ -44,12 +76,11 @@ class ExperimentPostprocessor:
     @classmethod
     def process_dataframe_for_output_table(cls, df, exp):
         """
-        - Sort by Utility in decreasing order
-        - Number the rows from 1 to n (length of the dataframe) to identify them easier on the plots.
+        - Number the rows from 1 to n (length of the dataframe) to identify them easier on the plots. The rows are
+          expected to be sorted by Utility in decreasing order.
         - Move Utility, Novelty, all the target columns and their uncertainties to the left of the dataframe.
         """
-        df = df.sort_values(by='Utility', ascending=False)
-        df.insert(loc=0, column='Row number', value=list(range(1, len(df) + 1)))
+        df.insert(loc=0, column='Row number', value=np.arange(1, len(df) + 1))
 
         if exp.novelty is not None:
             cols_to_move = ['Utility', 'Novelty'] + exp.target_names
@@ -69,4 +100,4 @@ class ExperimentPostprocessor:
         if len(exp.apriori_names) > 0:
             columns_for_plot.extend(exp.apriori_names)
 
-        return PlotGenerator.create_target_scatter_plot(df[columns_for_plot])
+        return PlotGenerator.create_target_scatter_plot(df[columns_for_plot], n_rows=len(exp.utility))
@@ -1,3 +1,6 @@
+import numpy as np
+import pandas as pd
+
 from slamd.common.error_handling import SequentialLearningException, ValueNotSupportedException, \
     SlamdUnprocessableEntityException
 from slamd.discovery.processing.experiment.experiment_model import ExperimentModel
@@ -7,10 +10,12 @@ class ExperimentPreprocessor:
 
     @classmethod
     def preprocess(cls, exp):
-        cls.filter_apriori_with_thresholds_and_update_orig_data(exp)
-        cls.filter_missing_inputs(exp)
+        # Select the rows and features to keep and encode the categorical features in one scan of the data, then
+        # replace the dataframe only once
+        row_mask = cls._rows_within_apriori_thresholds(exp)
+        (missing_features, codes) = cls._scan_features(exp, row_mask)
+        cls._apply_masks(exp, row_mask, missing_features, codes)
         cls.validate_experiment(exp)
-        cls.encode_categoricals(exp)
 
     @classmethod
     def validate_experiment(cls, exp):
@@ -74,40 +79,88 @@ class ExperimentPreprocessor:
 
     @classmethod
     def encode_categoricals(cls, exp):
-        non_numeric_features = exp.features_df.select_dtypes(exclude='number').columns
-
-        for feature in non_numeric_features:
-            exp.dataframe[feature], _ = exp.dataframe[feature].factorize()
+        (_, codes) = cls._scan_features(exp, None)
+        cls._apply_masks(exp, None, codes=codes)
 
     @classmethod
     def filter_missing_inputs(cls, exp):
-        for col in exp.feature_names.copy():
-            if exp.dataframe[col].isna().values.any():
-                exp.dataframe.drop(col, axis=1, inplace=True)
-                exp.feature_names.remove(col)
+        (missing_features, _) = cls._scan_features(exp, None)
+        cls._apply_masks(exp, None, missing_features)
 
     @classmethod
     def filter_apriori_with_thresholds_and_update_orig_data(cls, exp):
-        # In the future this function could be handled "live" and non-destructively in index_all_labelled and index_none_labelled
-        for (column, value, threshold) in zip(exp.apriori_names, exp.apriori_max_or_min, exp.apriori_thresholds):
-            if threshold is None:
+        cls._apply_masks(exp, cls._rows_within_apriori_thresholds(exp))
+
+    @classmethod
+    def _rows_within_apriori_thresholds(cls, exp):
+        """
+        Return the mask of the rows to keep: rows without any label are dropped if they miss one of the a priori
+        thresholds. Return None if no threshold is set.
+        """
+        thresholds = [(column, value, threshold) for (column, value, threshold)
+                      in zip(exp.apriori_names, exp.apriori_max_or_min, exp.apriori_thresholds)
+                      if threshold is not None]
+        if not thresholds:
+            return None
+
+        (columns, values, thresholds) = zip(*thresholds)
+        apriori = exp.dataframe[list(columns)].to_numpy(dtype=np.float64)
+        thresholds = np.array(thresholds, dtype=np.float64)
+        maximize = np.array(values) == 'max'
+        # Comparisons with missing a priori values are False, these rows are kept
+        missed = np.where(maximize, apriori < thresholds, apriori > thresholds).any(axis=1)
+
+        return ~(missed & exp.targets_df.isna().to_numpy().all(axis=1))
+
+    @classmethod
+    def _scan_features(cls, exp, row_mask):
+        """
+        Return the features with missing values in the rows selected by the mask and the codes of the non-numeric
+        features in these rows. Both come from the same scan as factorize marks missing values with -1.
+        """
+        numeric_features = [feature for feature in exp.feature_names if cls._is_numeric(exp.dataframe[feature])]
+        numeric_values = exp.dataframe[numeric_features].to_numpy(dtype=np.float64)
+        if row_mask is not None:
+            numeric_values = numeric_values[row_mask]
+        missing_features = {feature for (feature, missing) in zip(numeric_features,
+                                                                  np.isnan(numeric_values).any(axis=0)) if missing}
+
+        codes = {}
+        for feature in exp.feature_names:
+            if feature in numeric_features:
                 continue
+            values = exp.dataframe[feature].to_numpy()
+            (codes[feature], _) = pd.factorize(values if row_mask is None else values[row_mask])
+            if (codes[feature] == -1).any():
+                missing_features.add(feature)
+        return missing_features, codes
 
-            # index of rows in which all target columns are nan
-            nodata_index = exp.targets_df.isna().all(axis=1)
-            if value == 'max':
-                # Get dataframe mask based on threshold value and nodata_index.
-                # Apply mask to dataframe. Get index of values to drop.
-                # Use new index to drop values from original dataframe.
-                exp.dataframe.drop(
-                    exp.dataframe[(exp.dataframe[column] < threshold) & nodata_index].index,
-                    inplace=True
-                )
-            else:
-                exp.dataframe.drop(
-                    exp.dataframe[(exp.dataframe[column] > threshold) & nodata_index].index,
-                    inplace=True
-                )
+    @classmethod
+    def _is_numeric(cls, column):
+        # Like select_dtypes(include='number'), booleans are encoded as categoricals
+        return pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column)
 
-        exp.dataframe.reset_index(drop=True, inplace=True)
-        exp.orig_data = exp.dataframe.copy()
+    @classmethod
+    def _apply_masks(cls, exp, row_mask, dropped_features=(), codes=None):
+        """
+        Keep the rows selected by the mask, or all rows if it is None, drop the given features and replace the
+        non-numeric features by their codes. The rows are renumbered and orig_index remembers which rows of the
+        uploaded dataset are left.
+        """
+        if row_mask is not None and row_mask.all():
+            row_mask = None
+        columns = [column for column in exp.dataframe.columns if column not in dropped_features]
+
+        if row_mask is not None:
+            exp.dataframe = exp.dataframe.loc[row_mask, columns].reset_index(drop=True)
+            exp.orig_index = exp.orig_index[row_mask]
+        elif dropped_features:
+            exp.dataframe = exp.dataframe[columns]
+        if not exp.dataframe.index.equals(pd.RangeIndex(len(exp.dataframe))):
+            exp.dataframe = exp.dataframe.reset_index(drop=True)
+        exp.feature_names = [feature for feature in exp.feature_names if feature not in dropped_features]
+
+        encoded_features = [feature for feature in codes or {} if feature in exp.feature_names]
+        if encoded_features:
+            exp.dataframe[encoded_features] = np.column_stack([codes[feature] for feature in encoded_features])
+        exp.invalidate_cache()
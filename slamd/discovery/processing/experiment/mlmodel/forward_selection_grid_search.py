@@ -0,0 +1,102 @@
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import ParameterGrid, check_cv
+
+SFS_STEP = 'sfs'
+K_FEATURES = f'{SFS_STEP}__k_features'
+
+
+def fit_forward_path(selector, X, y, k_features):
+    """
+    Run the forward selection up to k_features and return the selected feature indices for every number of features
+    along the way.
+    """
+    selector = selector.set_params(k_features=k_features).fit(X, y)
+    return {k: list(subset['feature_idx']) for (k, subset) in selector.subsets_.items()}
+
+
+def score_subset(estimator, scorer, X_train, y_train, X_test, y_test, feature_idx):
+    estimator = estimator.fit(X_train[:, feature_idx], y_train)
+    return scorer(estimator, X_test[:, feature_idx], y_test)
+
+
+class ForwardSelectionGridSearch:
+    """
+    Replacement for GridSearchCV over a pipeline of a forward SequentialFeatureSelector followed by an estimator.
+
+    Forward selection to k features passes through the subsets of all smaller k. Instead of running the selection from
+    scratch for each grid point, run it once per CV fold up to the largest k of the grid and evaluate the second-stage
+    estimator on the cached subsets. Grid points which only differ in k or in the parameters of the second stage share
+    one forward path. Like GridSearchCV with refit=False, only best_params_ and best_score_ are set after fitting.
+    """
+
+    def __init__(self, estimator, param_grid, scoring=None, n_jobs=None, cv=None):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.cv = cv
+
+    def fit(self, X, y):
+        X = np.asarray(X)
+        y = np.asarray(y)
+        candidates = list(ParameterGrid(self.param_grid))
+        splits = list(check_cv(self.cv, y, classifier=False).split(X, y))
+
+        selector_params = [self._selector_params(params) for params in candidates]
+        unique_selector_params = []
+        for params in selector_params:
+            if params not in unique_selector_params:
+                unique_selector_params.append(params)
+
+        # The forward path cannot be longer than the number of features. Grid points asking for more are skipped.
+        max_k_features = {}
+        for (params, candidate) in zip(selector_params, candidates):
+            key = unique_selector_params.index(params)
+            max_k_features[key] = min(max(max_k_features.get(key, 0), candidate[K_FEATURES]), X.shape[1])
+
+        selector = self.estimator.named_steps[SFS_STEP]
+        paths = Parallel(n_jobs=self.n_jobs)(
+            delayed(fit_forward_path)(clone(selector).set_params(**params), X[train], y[train], max_k_features[key])
+            for (key, params) in enumerate(unique_selector_params)
+            for (train, _) in splits
+        )
+        paths = np.reshape(np.array(paths, dtype=object), (len(unique_selector_params), len(splits)))
+
+        final_step_name, final_step = self.estimator.steps[-1]
+        evaluations = [(i, j) for (i, candidate) in enumerate(candidates) for j in range(len(splits))
+                       if candidate[K_FEATURES] <= X.shape[1]]
+        if not evaluations:
+            raise ValueError(f'All grid points require more than the {X.shape[1]} available features')
+
+        scores = Parallel(n_jobs=self.n_jobs)(
+            delayed(score_subset)(
+                clone(final_step).set_params(**self._step_params(candidates[i], final_step_name)),
+                check_scoring(final_step, scoring=self.scoring),
+                X[splits[j][0]], y[splits[j][0]], X[splits[j][1]], y[splits[j][1]],
+                paths[unique_selector_params.index(selector_params[i]), j][candidates[i][K_FEATURES]]
+            )
+            for (i, j) in evaluations
+        )
+
+        test_scores = np.full((len(candidates), len(splits)), np.nan)
+        for ((i, j), score) in zip(evaluations, scores):
+            test_scores[i, j] = score
+
+        # As in GridSearchCV, grid points with a failed or undefined score in any fold rank last
+        mean_test_scores = test_scores.mean(axis=1)
+        best_index = int(np.argmax(np.nan_to_num(mean_test_scores, nan=-np.inf)))
+        self.best_params_ = candidates[best_index]
+        self.best_score_ = mean_test_scores[best_index]
+        return self
+
+    @classmethod
+    def _selector_params(cls, params):
+        return {name: value for (name, value) in cls._step_params(params, SFS_STEP).items() if name != 'k_features'}
+
+    @classmethod
+    def _step_params(cls, params, step_name):
+        prefix = f'{step_name}__'
+        return {name[len(prefix):]: value for (name, value) in params.items() if name.startswith(prefix)}
@@ -0,0 +1,149 @@
+from collections import deque
+from threading import Lock
+
+import numpy as np
+from scipy.linalg import cho_solve, cholesky, solve_triangular
+from sklearn.utils import check_random_state
+
+from slamd.discovery.processing.experiment.mlmodel.parallel_restart_gaussian_process_regressor import \
+    ParallelRestartGaussianProcessRegressor
+
+# Number of previous fits which are kept per process to be extended by newly labelled rows
+MAX_STORED_FITS = 8
+
+
+class IncrementalGaussianProcessRegressor(ParallelRestartGaussianProcessRegressor):
+    """
+    Gaussian Process Regressor which reuses a previous fit if the training data only grew by a few rows, as is the case
+    after new lab results have been added to a dataset. The kernel hyperparameters of the previous fit are kept and its
+    Cholesky factor is extended by a rank-k update instead of being recomputed from scratch. The hyperparameters are
+    only optimised again if the log-marginal-likelihood per training row drifts by more than lml_tolerance, with the
+    restarts running in parallel as in ParallelRestartGaussianProcessRegressor.
+    """
+
+    _previous_fits = deque(maxlen=MAX_STORED_FITS)
+    _lock = Lock()
+
+    def __init__(self, kernel=None, *, alpha=1e-10, optimizer='fmin_l_bfgs_b', n_restarts_optimizer=0,
+                 normalize_y=False, copy_X_train=True, n_targets=None, random_state=None, n_restart_workers=1,
+                 restart_tolerance=None, n_converged_restarts=3, lml_tolerance=0.1):
+        super().__init__(kernel=kernel, alpha=alpha, optimizer=optimizer, n_restarts_optimizer=n_restarts_optimizer,
+                         normalize_y=normalize_y, copy_X_train=copy_X_train, n_targets=n_targets,
+                         random_state=random_state, n_restart_workers=n_restart_workers,
+                         restart_tolerance=restart_tolerance, n_converged_restarts=n_converged_restarts)
+        self.lml_tolerance = lml_tolerance
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+
+        previous_fit, index_new = self._find_previous_fit(X, y)
+        if previous_fit is not None and self._update_previous_fit(previous_fit, X[index_new], y[index_new]):
+            self.incremental_update_ = True
+        else:
+            super().fit(X, y)
+            self.incremental_update_ = False
+
+        fit_state = self._create_fit_state()
+        with self._lock:
+            self._previous_fits.append(fit_state)
+        return self
+
+    def _create_fit_state(self):
+        return {
+            'params': repr(self.get_params(deep=False)),
+            'kernel_': self.kernel_,
+            'X_train_': self.X_train_,
+            'y_train_': self.y_train_,
+            'L_': self.L_,
+            'log_marginal_likelihood_value_': self.log_marginal_likelihood_value_,
+            '_y_train_mean': self._y_train_mean,
+            '_y_train_std': self._y_train_std,
+            'n_features_in_': self.n_features_in_,
+        }
+
+    def _find_previous_fit(self, X, y):
+        """
+        Return the largest previous fit whose training rows and labels are all contained in the given data, together
+        with the indices of the rows it has not been trained on. Return None if no previous fit can be extended.
+        """
+        if self.normalize_y or np.iterable(self.alpha) or self.optimizer is None:
+            # Normalising changes all labels and per-row noise does not cover the new rows, so refit
+            return None, None
+
+        params = repr(self.get_params(deep=False))
+        rows = [x.tobytes() + label.tobytes() for (x, label) in zip(X, y)]
+
+        # Iterate over a snapshot, other request threads may store their fits meanwhile
+        with self._lock:
+            previous_fits = list(self._previous_fits)
+
+        best_fit, best_index_new = None, None
+        for previous_fit in previous_fits:
+            if previous_fit['params'] != params or previous_fit['X_train_'].shape[1] != X.shape[1] \
+                    or previous_fit['y_train_'].shape[1:] != y.shape[1:] or len(previous_fit['y_train_']) > len(y):
+                continue
+
+            unmatched_rows = {}
+            for (i, row) in enumerate(rows):
+                unmatched_rows.setdefault(row, []).append(i)
+
+            contained = True
+            for (x, label) in zip(previous_fit['X_train_'], previous_fit['y_train_']):
+                matching_rows = unmatched_rows.get(x.tobytes() + label.tobytes())
+                if not matching_rows:
+                    contained = False
+                    break
+                matching_rows.pop()
+
+            if contained and (best_fit is None or len(previous_fit['y_train_']) > len(best_fit['y_train_'])):
+                best_fit = previous_fit
+                best_index_new = sorted(i for indices in unmatched_rows.values() for i in indices)
+
+        return best_fit, best_index_new
+
+    def _update_previous_fit(self, previous_fit, X_new, y_new):
+        """
+        Extend the Cholesky factor L of the previous kernel matrix by the new rows:
+        [[K11, K12], [K21, K22]] = [[L, 0], [L21, L22]] @ [[L, 0], [L21, L22]].T
+        Return False if the update is numerically unstable or the log-marginal-likelihood drifted too far.
+        """
+        kernel = previous_fit['kernel_']
+        X_old, L_old = previous_fit['X_train_'], previous_fit['L_']
+
+        if len(X_new) == 0:
+            L = L_old
+        else:
+            try:
+                L21 = solve_triangular(L_old, kernel(X_old, X_new), lower=True, check_finite=False).T
+                K22 = kernel(X_new) + self.alpha * np.eye(len(X_new))
+                L22 = cholesky(K22 - L21 @ L21.T, lower=True, check_finite=False)
+            except (np.linalg.LinAlgError, ValueError):
+                return False
+            L = np.block([[L_old, np.zeros((len(X_old), len(X_new)))], [L21, L22]])
+
+        X_train = np.vstack([X_old, X_new])
+        y_train = np.concatenate([previous_fit['y_train_'], y_new])
+        alpha = cho_solve((L, True), y_train, check_finite=False)
+
+        # Same formula as GaussianProcessRegressor.log_marginal_likelihood, but reusing the updated factor
+        y_2d, alpha_2d = y_train.reshape(len(y_train), -1), alpha.reshape(len(y_train), -1)
+        log_marginal_likelihood = (-0.5 * np.einsum('ik,ik->k', y_2d, alpha_2d) - np.log(np.diag(L)).sum() -
+                                   len(y_train) / 2 * np.log(2 * np.pi)).sum()
+
+        drift = abs(log_marginal_likelihood / len(y_train) -
+                    previous_fit['log_marginal_likelihood_value_'] / len(X_old))
+        if not np.isfinite(drift) or drift > self.lml_tolerance:
+            return False
+
+        self.kernel_ = kernel
+        self.X_train_ = X_train
+        self.y_train_ = y_train
+        self.L_ = L
+        self.alpha_ = alpha
+        self.log_marginal_likelihood_value_ = log_marginal_likelihood
+        self._y_train_mean = previous_fit['_y_train_mean']
+        self._y_train_std = previous_fit['_y_train_std']
+        self.n_features_in_ = previous_fit['n_features_in_']
+        self._rng = check_random_state(self.random_state)
+        return True
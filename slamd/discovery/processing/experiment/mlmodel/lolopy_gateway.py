@@ -0,0 +1,77 @@
+import logging
+import os
+import sys
+from threading import Lock, Thread
+
+import numpy as np
+from lolopy import loloserver
+from py4j.java_gateway import JavaGateway
+
+from slamd.common.slamd_utils import get_config_value
+
+logger = logging.getLogger(__name__)
+
+
+class LolopyGateway:
+    """
+    Starts the JVM used by lolopy with the configured heap size and number of threads. lolopy keeps a single gateway per
+    process and reuses it for every learner, so once the gateway is running all random forests share it. Starting and
+    warming it up in the background when the app boots keeps the JVM startup out of the first experiment request.
+    """
+
+    _lock = Lock()
+    _warmed_up = False
+
+    @classmethod
+    def start_in_background(cls, jvm_memory=None, jvm_threads=None):
+        Thread(target=cls.start, args=(jvm_memory, jvm_threads, True), name='lolopy-warm-up', daemon=True).start()
+
+    @classmethod
+    def start(cls, jvm_memory=None, jvm_threads=None, warm_up=False):
+        """
+        Launch the gateway unless it is already running. Requests which need the gateway while it is being started in
+        the background wait here until it is ready instead of launching a second JVM.
+        """
+        with cls._lock:
+            try:
+                if loloserver._lolopy_gateway is None:
+                    loloserver._lolopy_gateway = cls._launch_gateway(jvm_memory, jvm_threads)
+                if warm_up and not cls._warmed_up:
+                    cls._warm_up()
+            except Exception as error:
+                # Do not fail here, lolopy reports a missing Java installation when a model is actually used
+                logger.warning('Could not start the JVM for lolopy: %s', error)
+
+    @classmethod
+    def start_configured(cls):
+        """
+        Launch the gateway with the JVM options of the app or worker configuration unless it is already running.
+        """
+        cls.start(get_config_value('LOLOPY_JVM_MEMORY'), get_config_value('LOLOPY_JVM_THREADS'))
+
+    @classmethod
+    def _launch_gateway(cls, jvm_memory, jvm_threads):
+        java_options = []
+        if jvm_memory:
+            java_options.append(f'-Xmx{jvm_memory}')
+        if jvm_threads:
+            # lolo trains its trees with Scala parallel collections which run on the common fork join pool
+            java_options.append(f'-Djava.util.concurrent.ForkJoinPool.common.parallelism={jvm_threads}')
+            java_options.append(f'-Dscala.concurrent.context.maxThreads={jvm_threads}')
+
+        return JavaGateway.launch_gateway(
+            classpath=os.path.abspath(loloserver.find_lolo_jar()),
+            javaopts=java_options,
+            redirect_stdout=sys.stdout,
+            die_on_exit=True
+        )
+
+    @classmethod
+    def _warm_up(cls):
+        # Train and apply a tiny forest once so that lolo's classes are loaded and compiled before the first request
+        from slamd.discovery.processing.experiment.mlmodel.slamd_random_forest import SlamdRandomForest
+
+        rng = np.random.default_rng(42)
+        X = rng.uniform(size=(8, 2))
+        SlamdRandomForest().fit(X, X.sum(axis=1, keepdims=True)).predict(X, return_std=True)
+        cls._warmed_up = True
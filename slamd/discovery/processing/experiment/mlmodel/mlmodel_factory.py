@@ -4,7 +4,14 @@ from sklearn.decomposition import PCA
 from sklearn.pipeline import Pipeline
 
 from slamd.common.error_handling import ValueNotSupportedException
-from slamd.discovery.processing.experiment.mlmodel.slamd_random_forest import SlamdRandomForest
+from slamd.common.slamd_utils import get_config_value
+from slamd.discovery.processing.experiment.mlmodel.incremental_gaussian_process_regressor import \
+    IncrementalGaussianProcessRegressor
+from slamd.discovery.processing.experiment.mlmodel.lolopy_gateway import LolopyGateway
+from slamd.discovery.processing.experiment.mlmodel.parallel_restart_gaussian_process_regressor import \
+    ParallelRestartGaussianProcessRegressor
+from slamd.discovery.processing.experiment.mlmodel.slamd_random_forest import SlamdRandomForest, \
+    SlamdMultiTaskRandomForest
 from slamd.discovery.processing.experiment.mlmodel.tuned_gaussian_process_regressor import TunedGaussianProcessRegressor
 from slamd.discovery.processing.experiment.mlmodel.tuned_random_forest import TunedRandomForest
 from slamd.discovery.processing.experiment.experiment_model import ExperimentModel
@@ -18,12 +25,14 @@ class MLModelFactory:
         Initialize the model given by the user. Return a sklearn Regressor.
         The model must be one of the entries defined in ExperimentModel.
         """
+        if exp.model in cls._lolopy_models():
+            # Returns immediately if the gateway is running and waits if it is still being warmed up at app start
+            LolopyGateway.start_configured()
+
         if exp.model == ExperimentModel.RANDOM_FOREST.value:
             regressor = SlamdRandomForest()
         elif exp.model == ExperimentModel.GAUSSIAN_PROCESS.value:
-            # Hyperparameters from previous implementation of the app (Jupyter notebook).
-            kernel = ConstantKernel(1.0, (1e-3, 1e3)) * RBF(10, (1e-2, 1e2))
-            regressor = GaussianProcessRegressor(kernel=kernel, n_restarts_optimizer=9, random_state=42)
+            regressor = cls._create_gaussian_process()
         elif exp.model == ExperimentModel.PCA_GAUSSIAN_PROCESS.value:
             # These hyperparameters were found to be potentially interesting by running local experiments.
             predictor = GaussianProcessRegressor(n_restarts_optimizer=3, random_state=42)
@@ -48,3 +57,39 @@ class MLModelFactory:
             raise ValueNotSupportedException(message=f'Invalid model: {exp.model}')
 
         return regressor
+
+    @classmethod
+    def supports_shared_model(cls, exp):
+        return exp.model in [ExperimentModel.RANDOM_FOREST.value, ExperimentModel.GAUSSIAN_PROCESS.value]
+
+    @classmethod
+    def initialize_shared_model(cls, exp):
+        """
+        Initialize a multi-output model which is fitted once for several targets. The Gaussian Process shares its
+        kernel and the Random Forest shares its trees among all targets.
+        """
+        if exp.model == ExperimentModel.RANDOM_FOREST.value:
+            LolopyGateway.start_configured()
+            return SlamdMultiTaskRandomForest()
+        elif exp.model == ExperimentModel.GAUSSIAN_PROCESS.value:
+            # Standardise every target column, so that each target keeps the scale of its own mean and uncertainty
+            # instead of sharing the amplitude of the kernel
+            return cls._create_gaussian_process(normalize_y=True)
+        raise ValueNotSupportedException(message=f'{exp.model} does not support fitting several targets at once')
+
+    @classmethod
+    def _create_gaussian_process(cls, normalize_y=False):
+        # Hyperparameters from previous implementation of the app (Jupyter notebook).
+        kernel = ConstantKernel(1.0, (1e-3, 1e3)) * RBF(10, (1e-2, 1e2))
+        gp_params = dict(kernel=kernel, n_restarts_optimizer=9, random_state=42, normalize_y=normalize_y,
+                         n_restart_workers=get_config_value('GP_RESTART_WORKERS', 1),
+                         restart_tolerance=get_config_value('GP_RESTART_TOLERANCE', None))
+        if get_config_value('GP_INCREMENTAL_FIT', False):
+            return IncrementalGaussianProcessRegressor(
+                **gp_params, lml_tolerance=get_config_value('GP_INCREMENTAL_LML_TOLERANCE', 0.1))
+        return ParallelRestartGaussianProcessRegressor(**gp_params)
+
+    @classmethod
+    def _lolopy_models(cls):
+        return [ExperimentModel.RANDOM_FOREST.value, ExperimentModel.PCA_RANDOM_FOREST.value,
+                ExperimentModel.TUNED_RANDOM_FOREST.value]
@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.linalg import cho_solve, cholesky
+from sklearn.gaussian_process import GaussianProcessRegressor
+
+
+class ParallelRestartGaussianProcessRegressor(GaussianProcessRegressor):
+    """
+    Gaussian Process Regressor which runs the optimizer restarts for the kernel hyperparameters in a thread pool
+    instead of one after another. numpy and scipy release the GIL while computing the kernel matrix and its Cholesky
+    factor, which dominate each optimizer step.
+
+    If restart_tolerance is set, the restarts are run in batches of n_restart_workers and the optimisation stops
+    early once n_converged_restarts of them reached the best log-marginal-likelihood found so far within the tolerance.
+    Without early stopping the result is the same as that of GaussianProcessRegressor.
+    """
+
+    def __init__(self, kernel=None, *, alpha=1e-10, optimizer='fmin_l_bfgs_b', n_restarts_optimizer=0,
+                 normalize_y=False, copy_X_train=True, n_targets=None, random_state=None, n_restart_workers=1,
+                 restart_tolerance=None, n_converged_restarts=3):
+        super().__init__(kernel=kernel, alpha=alpha, optimizer=optimizer, n_restarts_optimizer=n_restarts_optimizer,
+                         normalize_y=normalize_y, copy_X_train=copy_X_train, n_targets=n_targets,
+                         random_state=random_state)
+        self.n_restart_workers = n_restart_workers
+        self.restart_tolerance = restart_tolerance
+        self.n_converged_restarts = n_converged_restarts
+
+    def fit(self, X, y):
+        if self.optimizer is None:
+            return super().fit(X, y)
+
+        # Let GaussianProcessRegressor validate and store the training data, but optimise the kernel ourselves
+        optimizer = self.optimizer
+        self.optimizer = None
+        try:
+            super().fit(X, y)
+        finally:
+            self.optimizer = optimizer
+
+        if self.kernel_.n_dims == 0:
+            return self
+
+        bounds = self.kernel_.bounds
+        if self.n_restarts_optimizer > 0 and not np.isfinite(bounds).all():
+            raise ValueError('Multiple optimizer restarts (n_restarts_optimizer>0) requires that all bounds are '
+                             'finite.')
+
+        optima = self._optimize_with_restarts(bounds)
+        best_theta, best_value = min(optima, key=lambda optimum: optimum[1])
+        self.n_optimizer_runs_ = len(optima)
+
+        self.kernel_.theta = best_theta
+        self.kernel_._check_bounds_params()
+        self.log_marginal_likelihood_value_ = -best_value
+
+        # Same as the end of GaussianProcessRegressor.fit with the optimised kernel
+        K = self.kernel_(self.X_train_)
+        K[np.diag_indices_from(K)] += self.alpha
+        self.L_ = cholesky(K, lower=True, check_finite=False)
+        self.alpha_ = cho_solve((self.L_, True), self.y_train_, check_finite=False)
+        return self
+
+    def _optimize_with_restarts(self, bounds):
+        """
+        Return (theta, negative log-marginal-likelihood) of every optimizer run. The initial values are drawn in the
+        same order as by GaussianProcessRegressor, so the runs are identical to its runs.
+        """
+        initial_thetas = [self.kernel_.theta] + [self._rng.uniform(bounds[:, 0], bounds[:, 1])
+                                                 for _ in range(self.n_restarts_optimizer)]
+        workers = max(1, min(self.n_restart_workers, len(initial_thetas)))
+
+        optima = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for start in range(0, len(initial_thetas), workers):
+                batch = initial_thetas[start:start + workers]
+                optima.extend(executor.map(lambda theta: self._constrained_optimization(
+                    self._negative_log_marginal_likelihood, theta, bounds), batch))
+                if self._restarts_converged(optima):
+                    break
+        return optima
+
+    def _negative_log_marginal_likelihood(self, theta, eval_gradient=True):
+        # Clone the kernel, the threads must not share the kernel whose theta is changed during the evaluation
+        if eval_gradient:
+            lml, grad = self.log_marginal_likelihood(theta, eval_gradient=True, clone_kernel=True)
+            return -lml, -grad
+        return -self.log_marginal_likelihood(theta, clone_kernel=True)
+
+    def _restarts_converged(self, optima):
+        if self.restart_tolerance is None:
+            return False
+        values = np.array([value for (_, value) in optima])
+        return np.count_nonzero(values - values.min() <= self.restart_tolerance) >= self.n_converged_restarts
@@ -1,22 +1,69 @@
 import numpy as np
 import pandas as pd
-from lolopy.learners import RandomForestRegressor
+from lolopy.learners import RandomForestRegressor, MultiTaskRandomForest
+
+from slamd.discovery.processing.experiment.mlmodel.lolopy_gateway import LolopyGateway
 
 
 LOLOPY_MINIMUM_DATA_POINTS = 8
+LOLOPY_PADDING_COPIES = 4
+
+
+def _pad_to_minimum_data_points(X, y, weights=None):
+    """
+    Repeat the whole data set four times if it has fewer rows than the library's minimum. Fewer or down-weighted copies
+    would be cheaper, but they change the bootstrap of lolo and with it the predictions and uncertainties.
+    """
+    X, y = np.asarray(X), np.asarray(y)
+
+    if y.shape[0] < LOLOPY_MINIMUM_DATA_POINTS:
+        index = np.tile(np.arange(y.shape[0]), LOLOPY_PADDING_COPIES)
+        X, y = X[index], y[index]
+        if weights is not None:
+            weights = np.asarray(weights)[index]
+
+    return X, pd.DataFrame(y), weights
+
+
+class PicklableLoloMixin:
+    """
+    Replaces the pickling of lolopy, which removes the gateway from the instance dictionary itself since Python 3.11.
+    That left a pickled model unusable and failed for fitted models. Pickle a copy of the attributes instead, so that
+    models can be sent to worker processes. Unpickling is left to lolopy, once the gateway has been started with the
+    configured JVM options. Worker processes thereby only launch a JVM when they receive their first lolo model.
+    """
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['gateway']
+        if self.model_ is not None:
+            state['model_'] = self.gateway.jvm.io.citrine.lolo.util.LoloPyDataLoader.serializeObject(
+                self.model_, self._compress_level)
+        return state
+
+    def __setstate__(self, state):
+        LolopyGateway.start_configured()
+        super().__setstate__(state)
 
 
-class SlamdRandomForest(RandomForestRegressor):
+class SlamdRandomForest(PicklableLoloMixin, RandomForestRegressor):
     """
     Simple Wrapper for LolopyRandomForest implementation that automatically pads input to match the library's
     minimum data requirements
     """
 
     def fit(self, X, y, weights=None, random_seed=42):
-        if y.shape[0] < LOLOPY_MINIMUM_DATA_POINTS:
-            X = np.tile(X, (4, 1))
-            y = np.tile(y, (4, 1))
+        X, y, weights = _pad_to_minimum_data_points(X, y, weights)
+
+        return super().fit(X, y, weights, random_seed)
 
-        y = pd.DataFrame(y)
+
+class SlamdMultiTaskRandomForest(PicklableLoloMixin, MultiTaskRandomForest):
+    """
+    Multi-output counterpart of SlamdRandomForest. All targets share the same trees, so the forest is only built once.
+    """
+
+    def fit(self, X, y, weights=None, random_seed=42):
+        X, y, weights = _pad_to_minimum_data_points(X, y, weights)
 
         return super().fit(X, y, weights, random_seed)
@@ -1,7 +1,7 @@
 from mlxtend.feature_selection import SequentialFeatureSelector
-from sklearn.model_selection import GridSearchCV
 from sklearn.pipeline import Pipeline
 
+from slamd.discovery.processing.experiment.mlmodel.forward_selection_grid_search import ForwardSelectionGridSearch
 from slamd.discovery.processing.experiment.mlmodel.slamd_random_forest import SlamdRandomForest
 
 
@@ -16,13 +16,13 @@ class TunedRandomForest:
                                                    cv=None)
         pipe = Pipeline([('sfs', sfs_rf_testing),
                         ('rf2', SlamdRandomForest())])
-        grid_search_cv = GridSearchCV(estimator=pipe,
-                                      param_grid=cls._create_parameters_for_grid_search(),
-                                      scoring='r2',
-                                      n_jobs=1,
-                                      cv=4,
-                                      refit=False)
+        grid_search_cv = ForwardSelectionGridSearch(estimator=pipe,
+                                                    param_grid=cls._create_parameters_for_grid_search(),
+                                                    scoring='r2',
+                                                    n_jobs=1,
+                                                    cv=4)
 
+        # The forward selection path is computed once per fold and shared by all grid points
         grid_search_cv = grid_search_cv.fit(training_rows, training_labels)
         # Return the best model found
         return pipe.set_params(**grid_search_cv.best_params_)
@@ -1,23 +1,41 @@
-import json
+import base64
+
 import numpy as np
 import pandas as pd
-import plotly
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from sklearn.manifold import TSNE
+from plotly.io.json import to_json_plotly
+
+from slamd.discovery.processing.experiment.tsne_embedding_cache import TSNEEmbeddingCache, PCA_PROJECTION, \
+    select_projection
 
 UNCERTAINTY_COLUMN_PREFIX = 'Uncertainty ('
+# Browsers render SVG scatter plots slowly with many points, so WebGL is used above this number of points
+WEBGL_MIN_POINTS = 1000
+# Larger target scatter plots are downsampled to this number of rows, keeping the rows with the highest utility
+MAX_SCATTER_POINTS = 5000
+TOP_UTILITY_POINTS = 1000
+# Numeric arrays are sent to Plotly.js as base64 encoded typed arrays of these types
+TYPED_ARRAY_DTYPES = {'float64': 'f8', 'float32': 'f4', 'int32': 'i4', 'uint32': 'u4', 'int16': 'i2', 'uint16': 'u2',
+                      'int8': 'i1', 'uint8': 'u1'}
 
 
 class PlotGenerator:
 
     @classmethod
-    def create_target_scatter_plot(cls, plot_df):
+    def create_target_scatter_plot(cls, plot_df, n_rows=None):
+        """
+        Create the scatter plot or scatter matrix of the targets. n_rows is the number of all predicted rows if plot_df
+        only contains the rows with the highest utility.
+        """
         dimensions = [col for col in plot_df.columns if not col.startswith(UNCERTAINTY_COLUMN_PREFIX)]
         dimensions.remove('Utility')
         dimensions.remove('Row number')
 
+        n_rows = len(plot_df) if n_rows is None else n_rows
+        plot_df = cls._downsample_for_scatter_plot(plot_df, dimensions)
+        webgl = len(plot_df) > WEBGL_MIN_POINTS
+
         if len(dimensions) == 1:
             # Generate a simple scatter plot if there is only one target property.
             # We include the Utility color-coded for aesthetic reasons.
@@ -27,7 +45,8 @@ class PlotGenerator:
                 y=plot_df['Utility'],
                 color=plot_df['Utility'],
                 customdata=plot_df['Row number'],
-                error_x=cls._select_error_col_if_available(plot_df, dimensions[0])
+                error_x=cls._select_error_col_if_available(plot_df, dimensions[0]),
+                webgl=webgl
             )
             fig.add_trace(scatter_plot)
             fig.update_layout(title='Scatter plot of target properties')
@@ -35,64 +54,61 @@ class PlotGenerator:
             fig.update_yaxes(title_text='Utility')
         else:
             # General case
-            # For n target properties and a priori information columns, we need a (n-1) x (n-1) matrix
-            matrix_size = len(dimensions) - 1
-            fig = make_subplots(rows=matrix_size, cols=matrix_size, start_cell='top-left',
-                                horizontal_spacing=0.01, vertical_spacing=0.01,
-                                shared_xaxes=True, shared_yaxes=True)
+            # For n target properties and a priori information columns, we need a (n-1) x (n-1) matrix. A single splom
+            # trace draws the lower triangle of it from one copy of the columns instead of one trace per panel.
+            fig = go.Figure()
+            fig.add_trace(cls._create_scatter_matrix(plot_df, dimensions))
             # Add title and remove the legend on the right that would show 'trace0', 'trace1', ...
             fig.update_layout(title='Scatter matrix of target properties', showlegend=False)
 
-            # Generate possible indices for the lower-triangle of the (n-1) x (n-1) matrix
-            row_indices, col_indices = np.tril_indices(n=matrix_size, k=0)
-            # Increment all indices by one (numpy array operator overload)
-            # because the first cell in the subplots is (1, 1)
-            row_indices += 1
-            col_indices += 1
-
-            for (row, col) in zip(row_indices, col_indices):
-                column_name = dimensions[col - 1]
-                row_name = dimensions[row]
-                scatter_plot = cls._create_scatter_plot(
-                    x=plot_df[column_name],
-                    y=plot_df[row_name],
-                    color=plot_df['Utility'],
-                    customdata=plot_df['Row number'],
-                    error_x=cls._select_error_col_if_available(plot_df, column_name),
-                    error_y=cls._select_error_col_if_available(plot_df, row_name),
-                )
-                if row == matrix_size:
-                    # If on the bottom edge of the matrix
-                    fig.update_xaxes(title_text=column_name, row=row, col=col)
-                if col == 1:
-                    # If on the left edge of the matrix
-                    fig.update_yaxes(title_text=row_name, row=row, col=col)
-                # Add subplot at given position
-                fig.add_trace(scatter_plot, row=row, col=col)
-
+        if len(plot_df) < n_rows:
+            fig.update_layout(title=f'{fig.layout.title.text} (showing {len(plot_df)} of {n_rows} rows)')
         fig.update_layout(height=1000)
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        return cls._to_json(fig)
+
+    @classmethod
+    def _downsample_for_scatter_plot(cls, plot_df, dimensions):
+        """
+        Keep at most MAX_SCATTER_POINTS rows: the rows with the highest utility, the rows with the smallest and largest
+        value of every plotted column and a random sample of the remaining rows. The order of the rows is kept.
+        """
+        if len(plot_df) <= MAX_SCATTER_POINTS:
+            return plot_df
+
+        keep = np.zeros(len(plot_df), dtype=bool)
+        keep[np.argpartition(-plot_df['Utility'].to_numpy(), TOP_UTILITY_POINTS)[:TOP_UTILITY_POINTS]] = True
+        for dimension in dimensions:
+            values = plot_df[dimension].to_numpy(dtype=np.float64)
+            if not np.isnan(values).all():
+                keep[[np.nanargmin(values), np.nanargmax(values)]] = True
+
+        remaining = np.flatnonzero(~keep)
+        n_sampled = max(MAX_SCATTER_POINTS - np.count_nonzero(keep), 0)
+        keep[np.random.default_rng(42).choice(remaining, size=n_sampled, replace=False)] = True
+        return plot_df[keep]
 
     @classmethod
     def create_tsne_input_space_plot(cls, plot_df):
-        # The perplexity must be less than the number of data points (the length of the dataframe).
-        # Handle this edge case by picking the smallest of the two.
-        tsne = TSNE(n_components=2, verbose=1, perplexity=min(20, len(plot_df) - 1),
-                    n_iter=350, random_state=42, init='pca', learning_rate=100)
-        # Exclude the columns that do not belong to the features
-        tsne_result = tsne.fit_transform(plot_df.drop(columns=['Row number', 'Utility', 'is_train_data']))
+        # Exclude the columns that do not belong to the features. The embedding only depends on the features, so they
+        # are passed in their original row order to reuse the embedding regardless of how the rows are sorted.
+        features = plot_df.drop(columns=['Row number', 'Utility', 'is_train_data']).sort_index()
+        embedding = TSNEEmbeddingCache.get_embedding(features)
+        tsne_result = pd.DataFrame(embedding, index=features.index).loc[plot_df.index].values
 
+        # Large datasets are projected with PCA instead of t-SNE
+        axis = 'PCA' if select_projection(len(features)) == PCA_PROJECTION else 't-SNE'
         tsne_result_df = pd.DataFrame(
             {'Row number': plot_df['Row number'],
-             't-SNE-1': tsne_result[:, 0],
-             't-SNE-2': tsne_result[:, 1],
+             f'{axis}-1': tsne_result[:, 0],
+             f'{axis}-2': tsne_result[:, 1],
              'Utility': plot_df['Utility'],
              'is_train_data': plot_df['is_train_data']}
         )
-        fig = px.scatter(tsne_result_df, x='t-SNE-1', y='t-SNE-2', color='Utility', symbol='is_train_data',
+        fig = px.scatter(tsne_result_df, x=f'{axis}-1', y=f'{axis}-2', color='Utility', symbol='is_train_data',
                          custom_data=['Row number'],
-                         title='Materials data in t-SNE coordinates: train data and targets',
-                         symbol_sequence=['circle', 'cross'], render_mode="svg")
+                         title=f'Materials data in {axis} coordinates: train data and targets',
+                         symbol_sequence=['circle', 'cross'],
+                         render_mode='webgl' if len(plot_df) > WEBGL_MIN_POINTS else 'svg')
         fig.update_traces(
             hovertemplate='Row number: %{customdata}, Utility: %{marker.color:.2f}',
             marker=dict(size=7)
@@ -108,11 +124,50 @@ class PlotGenerator:
             )
         )
 
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        return cls._to_json(fig)
+
+    @classmethod
+    def _to_json(cls, fig):
+        """
+        Serialise the figure with numeric arrays encoded as typed arrays, which Plotly.js decodes without parsing each
+        number. plotly uses orjson for the remaining JSON if it is installed.
+        """
+        return to_json_plotly(cls._encode_typed_arrays(fig.to_plotly_json()), engine='auto')
+
+    @classmethod
+    def _encode_typed_arrays(cls, value):
+        if isinstance(value, dict):
+            return {key: cls._encode_typed_arrays(item) for (key, item) in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [cls._encode_typed_arrays(item) for item in value]
+        if isinstance(value, np.ndarray) and value.ndim in (1, 2):
+            return cls._create_typed_array(value)
+        return value
+
+    @classmethod
+    def _create_typed_array(cls, values):
+        if values.dtype.kind in 'iu' and values.dtype.itemsize == 8:
+            # JavaScript has no 64-bit integer arrays which Plotly.js can use
+            int32 = np.iinfo(np.int32)
+            fits_int32 = values.size == 0 or (values.min() >= int32.min and values.max() <= int32.max)
+            values = values.astype(np.int32 if fits_int32 else np.float64)
+
+        dtype = TYPED_ARRAY_DTYPES.get(values.dtype.name)
+        if dtype is None:
+            # Leave strings, booleans and dates to the JSON encoder
+            return values
+
+        data = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+        typed_array = {'dtype': dtype, 'bdata': base64.b64encode(data).decode('ascii')}
+        if values.ndim == 2:
+            typed_array['shape'] = f'{values.shape[0]},{values.shape[1]}'
+        return typed_array
 
     @classmethod
-    def _create_scatter_plot(cls, x=None, y=None, color=None, customdata=None, error_x=None, error_y=None):
-        return go.Scatter(
+    def _create_scatter_plot(cls, x=None, y=None, color=None, customdata=None, error_x=None, error_y=None,
+                             webgl=False):
+        scatter = go.Scattergl if webgl else go.Scatter
+        return scatter(
             x=x,
             y=y,
             mode='markers',
@@ -147,6 +202,36 @@ class PlotGenerator:
             name=''
         )
 
+    @classmethod
+    def _create_scatter_matrix(cls, plot_df, dimensions):
+        # splom traces have no error bars, so the uncertainties are shown in the tooltip instead
+        error_columns = [f'{UNCERTAINTY_COLUMN_PREFIX}{dimension})' for dimension in dimensions
+                         if f'{UNCERTAINTY_COLUMN_PREFIX}{dimension})' in plot_df.columns]
+        hovertemplate = 'Row number: %{customdata[0]}, X: %{x:.2f}, Y: %{y:.2f}, Utility: %{marker.color:.2f}'
+        for (i, error_column) in enumerate(error_columns, start=1):
+            hovertemplate += f'<br>{error_column}: %{{customdata[{i}]:.2f}}'
+
+        return go.Splom(
+            dimensions=[dict(label=dimension, values=plot_df[dimension]) for dimension in dimensions],
+            # Only draw the panels below the diagonal
+            showupperhalf=False,
+            diagonal=dict(visible=False),
+            marker=dict(
+                size=7,
+                color=plot_df['Utility'],
+                colorbar=dict(
+                    title='Utility'
+                ),
+                colorscale='Plasma'
+            ),
+            customdata=plot_df[['Row number'] + error_columns],
+            hovertemplate=hovertemplate,
+            # Make hover label have a black background
+            hoverlabel=dict(bgcolor='black'),
+            # Remove default name 'trace0'
+            name=''
+        )
+
     @classmethod
     def _select_error_col_if_available(cls, plot_df, column_name=None):
         """
@@ -0,0 +1,86 @@
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+
+import pandas as pd
+
+from slamd.common.slamd_utils import get_config_value
+
+
+class PredictionCache:
+    """
+    Process-wide LRU cache of the predictions and uncertainties of fitted models. Entries are keyed by the content of
+    the preprocessed features and labels together with the experiment configuration that influences the fit, so that
+    changing only curiosity, weights or thresholds reuses the previous fit. The cache is disabled if its memory budget
+    PREDICTION_CACHE_MAX_BYTES is 0, which is the default outside of an app context.
+    """
+
+    _entries = OrderedDict()
+    _size_in_bytes = 0
+    _lock = Lock()
+
+    @classmethod
+    def create_key(cls, exp):
+        if cls._max_size_in_bytes() <= 0:
+            return None
+
+        key = hashlib.sha256()
+        for df in [exp.features_df, exp.targets_df]:
+            key.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+        key.update(repr((exp.model, exp.feature_names, exp.target_names,
+                         get_config_value('EXPERIMENT_SHARED_FIT', False),
+                         get_config_value('GP_RESTART_TOLERANCE', None),
+                         get_config_value('GP_INCREMENTAL_FIT', False),
+                         get_config_value('GP_INCREMENTAL_LML_TOLERANCE', 0.1))).encode())
+        return key.hexdigest()
+
+    @classmethod
+    def load(cls, key, exp):
+        """
+        Write the cached prediction and uncertainty into the experiment. Return False if there is no cached entry.
+        """
+        if key is None:
+            return False
+
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is None:
+                return False
+            cls._entries.move_to_end(key)
+
+        prediction, uncertainty, _ = entry
+        exp.prediction = prediction.copy()
+        exp.uncertainty = uncertainty.copy()
+        return True
+
+    @classmethod
+    def save(cls, key, exp):
+        if key is None:
+            return
+
+        max_size_in_bytes = cls._max_size_in_bytes()
+        size_in_bytes = int(exp.prediction.memory_usage(deep=True).sum() +
+                            exp.uncertainty.memory_usage(deep=True).sum())
+        if size_in_bytes > max_size_in_bytes:
+            return
+
+        with cls._lock:
+            if key in cls._entries:
+                cls._size_in_bytes -= cls._entries.pop(key)[2]
+            cls._entries[key] = (exp.prediction.copy(), exp.uncertainty.copy(), size_in_bytes)
+            cls._size_in_bytes += size_in_bytes
+
+            # Evict the least recently used entries until the cache fits into its budget again
+            while cls._size_in_bytes > max_size_in_bytes:
+                _, (_, _, evicted_size_in_bytes) = cls._entries.popitem(last=False)
+                cls._size_in_bytes -= evicted_size_in_bytes
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+            cls._size_in_bytes = 0
+
+    @classmethod
+    def _max_size_in_bytes(cls):
+        return get_config_value('PREDICTION_CACHE_MAX_BYTES', 0)
@@ -0,0 +1,62 @@
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, the peak memory is not recorded there
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def process_peak_memory_mb():
+    """
+    Return the peak resident memory of the current process in MB since it was started, which only costs a system call.
+    """
+    if resource is None:
+        return None
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is given in bytes on macOS and in kilobytes elsewhere
+    return round(peak_memory / 1024 ** (2 if sys.platform == 'darwin' else 1), 1)
+
+
+def start_stage():
+    return time.perf_counter(), process_peak_memory_mb()
+
+
+def create_stage_timing(stage, start, **details):
+    """
+    Return the timing of a stage started with start_stage. The peak memory of a long-lived process cannot be attributed
+    to a single stage, so two values are recorded: process_peak_memory_mb is the peak of the whole process lifetime and
+    peak_memory_increase_mb is how far the stage raised it, which is 0 if the stage stayed below an earlier peak.
+    """
+    (start_time, start_peak_memory) = start
+    peak_memory = process_peak_memory_mb()
+    peak_memory_increase = None if peak_memory is None else round(peak_memory - start_peak_memory, 1)
+    return {'stage': stage, 'seconds': round(time.perf_counter() - start_time, 6),
+            'peak_memory_increase_mb': peak_memory_increase, 'process_peak_memory_mb': peak_memory, **details}
+
+
+@contextmanager
+def measure_stage(timings, stage, **details):
+    """
+    Append the duration of the block and its effect on the peak memory of the process to the list of timings.
+    """
+    start = start_stage()
+    try:
+        yield
+    finally:
+        timings.append(create_stage_timing(stage, start, **details))
+
+
+def log_stage_timings(timings, **context):
+    """
+    Write the timings as one JSON log record. They are also attached as the attribute stage_timings of the record for
+    handlers which process structured data.
+    """
+    record = {**context, 'stages': timings}
+    logger.info('Experiment stage timings: %s', json.dumps(record), extra={'stage_timings': record})
@@ -0,0 +1,168 @@
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import PCA
+from sklearn.manifold import TSNE
+from sklearn.neighbors import NearestNeighbors
+
+from slamd.common.slamd_utils import get_config_value
+
+
+# Up to this number of rows all rows are embedded with t-SNE
+TSNE_MAX_ROWS = 2000
+# Up to this number of rows a sample of landmark rows is embedded with t-SNE and the other rows are placed relative to
+# their nearest landmarks. Larger datasets are projected onto their first two principal components.
+LANDMARK_TSNE_MAX_ROWS = 100000
+TSNE_LANDMARKS = 1000
+LANDMARK_NEIGHBOURS = 5
+# Wide feature matrices are reduced with PCA before t-SNE, which only needs the coarse neighbourhood structure
+TSNE_MAX_DIMENSIONS = 50
+
+TSNE_PROJECTION = 't-SNE'
+LANDMARK_TSNE_PROJECTION = 'landmark t-SNE'
+PCA_PROJECTION = 'PCA'
+
+
+def select_projection(n_rows):
+    if n_rows <= TSNE_MAX_ROWS:
+        return TSNE_PROJECTION
+    if n_rows <= LANDMARK_TSNE_MAX_ROWS:
+        return LANDMARK_TSNE_PROJECTION
+    return PCA_PROJECTION
+
+
+def compute_tsne_embedding(features):
+    """
+    Project the features onto two dimensions with the projection selected by the number of rows.
+    """
+    values = np.asarray(features, dtype=np.float64)
+    projection = select_projection(len(values))
+
+    if projection == PCA_PROJECTION:
+        return _project_with_pca(values, 2)
+
+    if values.shape[1] > TSNE_MAX_DIMENSIONS:
+        values = _project_with_pca(values, TSNE_MAX_DIMENSIONS)
+
+    if projection == TSNE_PROJECTION:
+        return _embed_with_tsne(values)
+    return _embed_with_landmark_tsne(values)
+
+
+def _embed_with_tsne(values):
+    # The perplexity must be less than the number of data points (the length of the dataframe).
+    # Handle this edge case by picking the smallest of the two.
+    tsne = TSNE(n_components=2, verbose=1, perplexity=min(20, len(values) - 1),
+                n_iter=350, random_state=42, init='pca', learning_rate=100)
+    return tsne.fit_transform(values)
+
+
+def _embed_with_landmark_tsne(values):
+    """
+    Embed a random sample of landmark rows with t-SNE and place every other row at the inverse-distance weighted mean
+    of the embeddings of its nearest landmarks.
+    """
+    landmarks = np.sort(np.random.default_rng(42).choice(len(values), size=TSNE_LANDMARKS, replace=False))
+    landmark_embedding = _embed_with_tsne(values[landmarks])
+
+    distances, neighbours = NearestNeighbors(n_neighbors=LANDMARK_NEIGHBOURS).fit(values[landmarks]).kneighbors(values)
+    weights = 1 / np.maximum(distances, np.finfo(np.float64).eps)
+    embedding = np.einsum('ij,ijk->ik', weights, landmark_embedding[neighbours]) / weights.sum(axis=1, keepdims=True)
+    embedding[landmarks] = landmark_embedding
+    return embedding
+
+
+def _project_with_pca(values, n_components):
+    projection = PCA(n_components=min(n_components, *values.shape)).fit_transform(values)
+    # Pad with zeros if there are fewer features or rows than requested components
+    return np.pad(projection, ((0, 0), (0, n_components - projection.shape[1])))
+
+
+class TSNEEmbeddingCache:
+    """
+    Process-wide LRU cache of the two-dimensional projections of the input space for the t-SNE plot, keyed by the
+    content of the normalised feature matrix. The embedding does not depend on the utility, which only colours the
+    plot, so rescoring an experiment or opening its plot again reuses it. After an experiment has finished, its
+    embedding is computed in a background thread so that it is usually ready when the plot is requested. The cache is
+    disabled if TSNE_CACHE_MAX_ENTRIES is 0, which is the default outside of an app context.
+    """
+
+    _entries = OrderedDict()
+    _pending = {}
+    _lock = Lock()
+    _executor = None
+
+    @classmethod
+    def create_key(cls, features):
+        key = hashlib.sha256()
+        key.update(pd.util.hash_pandas_object(features, index=True).values.tobytes())
+        key.update(repr(features.shape).encode())
+        return key.hexdigest()
+
+    @classmethod
+    def compute_in_background(cls, features):
+        max_entries = cls._max_entries()
+        if max_entries <= 0 or not get_config_value('TSNE_BACKGROUND_EMBEDDING', False):
+            return
+
+        key = cls.create_key(features)
+        with cls._lock:
+            if key in cls._entries or key in cls._pending:
+                return
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tsne-embedding')
+            cls._pending[key] = cls._executor.submit(cls._compute_and_save, key, features, max_entries)
+
+    @classmethod
+    def get_embedding(cls, features):
+        """
+        Return the embedding of the given features. Wait for it if it is still being computed in the background and
+        compute it right away if it has not been requested before.
+        """
+        max_entries = cls._max_entries()
+        if max_entries <= 0:
+            return compute_tsne_embedding(features)
+
+        key = cls.create_key(features)
+        with cls._lock:
+            embedding = cls._entries.get(key)
+            if embedding is not None:
+                cls._entries.move_to_end(key)
+                return embedding
+            pending = cls._pending.get(key)
+
+        if pending is not None:
+            return pending.result()
+        return cls._compute_and_save(key, features, max_entries)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+
+    @classmethod
+    def _compute_and_save(cls, key, features, max_entries):
+        try:
+            embedding = compute_tsne_embedding(features)
+        except Exception:
+            with cls._lock:
+                cls._pending.pop(key, None)
+            raise
+
+        # The cached array is shared by all requests
+        embedding.setflags(write=False)
+        with cls._lock:
+            cls._entries[key] = embedding
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > max_entries:
+                cls._entries.popitem(last=False)
+            cls._pending.pop(key, None)
+        return embedding
+
+    @classmethod
+    def _max_entries(cls):
+        return get_config_value('TSNE_CACHE_MAX_ENTRIES', 0)
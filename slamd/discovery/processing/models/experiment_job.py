@@ -0,0 +1,15 @@
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+
+@dataclass
+class ExperimentJob:
+    job_id: str = None
+    dataset_name: str = None
+    request_body: dict = None
+    dataset_fingerprint: int = None
+    future: Future = None
+    # Id of the session which submitted the job, only this session can query and collect it
+    owner: str = None
+    # Time in seconds of time.monotonic() at which the job finished, used to evict uncollected results
+    finished_at: float = None
@@ -0,0 +1,19 @@
+from dataclasses import dataclass, field
+
+from pandas import DataFrame, Index, Series
+
+
+@dataclass
+class ExperimentResult:
+    """
+    The outputs of a finished experiment which are kept in the session. The uploaded dataset, its features and labels
+    are not stored, rescoring and downloading the complete output table rebuild the experiment from the dataset.
+    """
+
+    prediction: DataFrame = None
+    uncertainty: DataFrame = None
+    utility: Series = None
+    novelty: Series = None
+    # Labels of the rows of the uploaded dataset which were left after preprocessing
+    orig_index: Index = None
+    timings: list[dict] = field(default_factory=list)
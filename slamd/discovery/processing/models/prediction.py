@@ -2,9 +2,13 @@ from dataclasses import dataclass
 
 from pandas import DataFrame
 
+from slamd.discovery.processing.models.experiment_result import ExperimentResult
+
 
 @dataclass
 class Prediction:
     dataset_used_for_prediction: str = ''
     dataframe: DataFrame = None
     metadata: dict = None
+    experiment_result: ExperimentResult = None
+    dataset_fingerprint: int = None
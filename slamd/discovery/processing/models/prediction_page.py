@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class PredictionPage:
+    columns: list[str] = None
+    rows: list[list] = None
+    page: int = 1
+    page_size: int = None
+    total_rows: int = 0
+    filtered_rows: int = 0
+    sort_by: str = None
+    ascending: bool = True
+    search: str = ''
@@ -72,26 +72,177 @@ async function tsnePlotListener() {
 
     if (response.ok) {
         const tsnePlotData = await response.json();
-        Plotly.plot("tsne-plot-placeholder", tsnePlotData.data, tsnePlotData.layout, {responsive: true});
+        Plotly.newPlot("tsne-plot-placeholder", tsnePlotData.data, tsnePlotData.layout, {responsive: true});
     } else {
         const error = await response.text();
         document.write(error);
     }
 }
 
+const EXPERIMENT_JOB_POLLING_INTERVAL = 1000;
+
+/**
+ * The experiment runs as a background job on the server. Submit it, then poll its result until the job has finished.
+ */
 async function runExperiment() {
-    const experimentRequest = createRunExperimentRequest();
     // The endpoint is the current URL which should contain the dataset name
     // For example: http://127.0.0.1:5001/materials/discovery/MaterialsDiscoveryExampleData.csv
+    await fetchExperimentResult(`${window.location.href}/jobs`);
+}
+
+/**
+ * Rerank the last result after the curiosity has changed. The server reuses the stored predictions and only
+ * recomputes the utility, unless the configuration requires fitting the model again. In that case it submits the
+ * experiment as a job and the result is polled like that of a submitted experiment.
+ */
+async function rescoreExperiment() {
+    const experimentResultAvailable = document.getElementById("scatter-plot-placeholder") !== null;
+
+    if (!experimentResultAvailable) {
+        return;
+    }
+
+    await fetchExperimentResult(`${window.location.href}/rescore`);
+}
+
+/**
+ * Post the experiment to the given URL. A response with status 202 contains the id of a job, whose result is polled
+ * until the job has finished. Polling the result endpoint returns 202 with the status of the job as long as it is
+ * queued or running.
+ */
+async function fetchExperimentResult(url) {
+    const token = document.getElementById("csrf_token").value;
+    const experimentRequest = createRunExperimentRequest();
 
     insertSpinnerInPlaceholder("experiment-result-placeholder");
-    await postDataAndEmbedTemplateInPlaceholder(window.location.href, "experiment-result-placeholder", experimentRequest);
+    let resultResponse = await fetch(url, {
+        method: "POST",
+        headers: {
+            "X-CSRF-TOKEN": token,
+        },
+        body: JSON.stringify(experimentRequest),
+    });
+    if (resultResponse.status === 202) {
+        const job = await resultResponse.json();
+        resultResponse = await fetch(`${DISCOVERY_URL}/jobs/${job["job_id"]}/result`);
+        while (resultResponse.status === 202) {
+            await new Promise((resolve) => setTimeout(resolve, EXPERIMENT_JOB_POLLING_INTERVAL));
+            resultResponse = await fetch(`${DISCOVERY_URL}/jobs/${job["job_id"]}/result`);
+        }
+    }
     removeSpinnerInPlaceholder("experiment-result-placeholder");
 
+    if (resultResponse.ok) {
+        const result = await resultResponse.json();
+        document.getElementById("experiment-result-placeholder").innerHTML = result["template"];
+        embedExperimentResult();
+    } else {
+        const error = await resultResponse.text();
+        document.write(error);
+    }
+}
+
+function embedExperimentResult() {
     // The scatter plot data is embedded in the HTML placeholders. Turn the JSON data into actual plots.
     plotJsonDataInPlaceholder("scatter-plot-placeholder");
 
     document.getElementById("tsne-plot-button").addEventListener('click', tsnePlotListener)
+
+    embedPredictionTable();
+}
+
+const PREDICTION_TABLE_SEARCH_DELAY = 300;
+let predictionPage = null;
+let predictionTableSearchTimeout = null;
+
+/**
+ * The first page of the prediction is embedded in the result as JSON. Further pages are fetched from the server,
+ * which sorts, filters and slices the stored prediction, so that the table never holds more than one page of rows.
+ */
+function embedPredictionTable() {
+    predictionPage = JSON.parse(document.getElementById("prediction-table-placeholder").textContent);
+    renderPredictionTable();
+
+    document.getElementById("prediction-table-previous-button").addEventListener("click", () => {
+        fetchPredictionPage({page: predictionPage.page - 1});
+    });
+    document.getElementById("prediction-table-next-button").addEventListener("click", () => {
+        fetchPredictionPage({page: predictionPage.page + 1});
+    });
+    document.getElementById("prediction-table-search").addEventListener("input", (event) => {
+        clearTimeout(predictionTableSearchTimeout);
+        predictionTableSearchTimeout = setTimeout(() => {
+            fetchPredictionPage({page: 1, search: event.target.value});
+        }, PREDICTION_TABLE_SEARCH_DELAY);
+    });
+}
+
+async function fetchPredictionPage(changes) {
+    const query = {
+        page: predictionPage.page,
+        page_size: predictionPage.page_size,
+        ascending: predictionPage.ascending,
+        search: predictionPage.search,
+        ...changes,
+    };
+    const sortBy = "sort_by" in changes ? changes.sort_by : predictionPage.sort_by;
+    if (sortBy !== null) {
+        query.sort_by = sortBy;
+    }
+
+    const response = await fetch(`${DISCOVERY_URL}/prediction?${new URLSearchParams(query)}`);
+    if (response.ok) {
+        predictionPage = await response.json();
+        renderPredictionTable();
+    } else {
+        const error = await response.text();
+        document.write(error);
+    }
+}
+
+function sortPredictionTable(column) {
+    // Clicking the sorted column again reverses the order
+    const ascending = predictionPage.sort_by === column ? !predictionPage.ascending : false;
+    fetchPredictionPage({page: 1, sort_by: column, ascending});
+}
+
+function renderPredictionTable() {
+    const table = document.createElement("table");
+    table.id = "formulations_dataframe";
+    table.className = "table table-bordered table-striped table-hover topscroll-table";
+
+    const headerRow = table.createTHead().insertRow();
+    for (const column of predictionPage.columns) {
+        const header = document.createElement("th");
+        header.style.cursor = "pointer";
+        header.textContent = column;
+        if (predictionPage.sort_by === column) {
+            header.textContent += predictionPage.ascending ? " \u25B2" : " \u25BC";
+        }
+        header.addEventListener("click", () => sortPredictionTable(column));
+        headerRow.appendChild(header);
+    }
+
+    const body = table.createTBody();
+    for (const row of predictionPage.rows) {
+        const tableRow = body.insertRow();
+        for (const value of row) {
+            tableRow.insertCell().textContent = value === null ? "" : value;
+        }
+    }
+
+    const placeholder = document.getElementById("prediction-table-placeholder");
+    placeholder.replaceChildren(table);
+
+    const firstRow = predictionPage.filtered_rows === 0 ? 0 : (predictionPage.page - 1) * predictionPage.page_size + 1;
+    const lastRow = Math.min(predictionPage.page * predictionPage.page_size, predictionPage.filtered_rows);
+    let pageInfo = `Rows ${firstRow}-${lastRow} of ${predictionPage.filtered_rows}`;
+    if (predictionPage.filtered_rows !== predictionPage.total_rows) {
+        pageInfo += ` (filtered from ${predictionPage.total_rows})`;
+    }
+    document.getElementById("prediction-table-page-info").textContent = pageInfo;
+    document.getElementById("prediction-table-previous-button").disabled = predictionPage.page <= 1;
+    document.getElementById("prediction-table-next-button").disabled = lastRow >= predictionPage.filtered_rows;
 }
 
 function toggleRunExperimentButton() {
@@ -108,6 +259,7 @@ window.addEventListener("load", () => {
     document.getElementById("target_properties").addEventListener("change", onChangeTargetProperties);
     document.getElementById("a_priori_information").addEventListener("change", onChangeAPrioriInformation);
     document.getElementById("run-experiment-button").addEventListener("click", runExperiment);
+    document.getElementById("curiosity").addEventListener("change", rescoreExperiment);
     document.getElementById("materials_data_input").addEventListener("change", toggleRunExperimentButton);
     document.getElementById("target_properties").addEventListener("change", toggleRunExperimentButton);
 });
@@ -84,5 +84,5 @@ function createRunExperimentRequest() {
 function plotJsonDataInPlaceholder(placeholderId) {
     const plotJson = JSON.parse(document.getElementById(placeholderId).textContent);
     removeInnerHtmlFromPlaceholder(placeholderId);
-    Plotly.plot(placeholderId, plotJson.data, plotJson.layout, {responsive: true});
+    Plotly.newPlot(placeholderId, plotJson.data, plotJson.layout, {responsive: true});
 }
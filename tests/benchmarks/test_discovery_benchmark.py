@@ -0,0 +1,44 @@
+from benchmarks.discovery_benchmark import STAGES, compare, create_benchmark_app, run_experiment_stages, summarize
+from benchmarks.synthetic_dataset import create_synthetic_dataset
+from slamd.discovery.processing.experiment.experiment_model import ExperimentModel
+
+
+def test_create_synthetic_dataset_creates_partially_labelled_targets_and_categorical_features():
+    dataset = create_synthetic_dataset(n_rows=100, n_features=5, n_targets=2, label_fraction=0.2, n_categorical=2,
+                                       n_apriori=1)
+
+    assert dataset.feature_names == ['Feature 1', 'Feature 2', 'Feature 3', 'Category 1', 'Category 2']
+    assert dataset.target_names == ['Target 1', 'Target 2']
+    assert dataset.apriori_names == ['A priori 1']
+    assert dataset.dataframe.shape == (100, 8)
+    assert dataset.dataframe['Category 1'].dtype == object
+    assert list(dataset.dataframe[dataset.target_names].count()) == [20, 20]
+
+
+def test_run_experiment_stages_times_every_stage():
+    dataset = create_synthetic_dataset(n_rows=60, n_features=4, n_targets=2, label_fraction=0.25, n_categorical=1)
+
+    timings, stage_timings = run_experiment_stages(create_benchmark_app('testing'), dataset,
+                                                   ExperimentModel.PCA_GAUSSIAN_PROCESS.value)
+
+    assert list(timings) == STAGES + ['total']
+    assert all(timings[stage] > 0 for stage in STAGES)
+    assert timings['total'] == sum(timings[stage] for stage in STAGES)
+    # The targets are fitted one after another and their fit times are added up
+    assert [timing['targets'] for timing in stage_timings if timing['stage'] == 'fit'] == [['Target 1'], ['Target 2']]
+    assert timings['fit'] == sum(timing['seconds'] for timing in stage_timings if timing['stage'] == 'fit')
+
+
+def test_compare_reports_ratio_of_median_timings():
+    def create_benchmark(fit_times):
+        timings = [dict(dict.fromkeys(STAGES + ['total'], 1.0), fit=fit_time) for fit_time in fit_times]
+        results = [{'model': 'model', 'rows': 100, 'timings': timing, 'error': None} for timing in timings]
+        results.append({'model': 'model', 'rows': 100, 'timings': None, 'error': 'failed'})
+        return {'results': results}
+
+    baseline, current = create_benchmark([2.0, 4.0, 9.0]), create_benchmark([1.0, 2.0, 3.0])
+
+    assert summarize(baseline)[('model', 100)]['fit'] == 4.0
+    lines = compare(baseline, current).splitlines()
+    fit_line = next(line for line in lines if ' fit ' in line)
+    assert fit_line.split()[-3:] == ['4.0000', '2.0000', '0.50']
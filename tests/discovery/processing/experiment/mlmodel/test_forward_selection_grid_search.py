@@ -0,0 +1,53 @@
+import numpy as np
+from mlxtend.feature_selection import SequentialFeatureSelector
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import GridSearchCV
+from sklearn.pipeline import Pipeline
+
+from slamd.discovery.processing.experiment.mlmodel import forward_selection_grid_search
+from slamd.discovery.processing.experiment.mlmodel.forward_selection_grid_search import ForwardSelectionGridSearch
+
+
+def _create_pipeline():
+    sfs = SequentialFeatureSelector(estimator=Ridge(), forward=True, floating=False, scoring='r2', cv=None)
+    return Pipeline([('sfs', sfs), ('ridge2', Ridge())])
+
+
+def _create_training_data():
+    rng = np.random.default_rng(42)
+    X = rng.uniform(size=(24, 8))
+    y = (X[:, 0] + 2 * X[:, 3] - X[:, 5] + 0.1 * rng.normal(size=24)).reshape(-1, 1)
+    return X, y
+
+
+def test_forward_selection_grid_search_finds_same_parameters_as_grid_search_cv():
+    X, y = _create_training_data()
+    param_grid = {'sfs__k_features': [1, 3, 5], 'ridge2__alpha': [0.01, 10.0]}
+
+    expected = GridSearchCV(estimator=_create_pipeline(), param_grid=param_grid, scoring='r2', cv=4, refit=False)
+    expected.fit(X, y)
+    actual = ForwardSelectionGridSearch(estimator=_create_pipeline(), param_grid=param_grid, scoring='r2', cv=4)
+    actual.fit(X, y)
+
+    assert actual.best_params_ == expected.best_params_
+    assert np.isclose(actual.best_score_, expected.best_score_)
+
+
+def test_forward_selection_grid_search_runs_forward_path_once_per_fold(monkeypatch):
+    fitted_k_features = []
+    fit_forward_path = forward_selection_grid_search.fit_forward_path
+
+    def mock_fit_forward_path(selector, X, y, k_features):
+        fitted_k_features.append(k_features)
+        return fit_forward_path(selector, X, y, k_features)
+
+    monkeypatch.setattr(forward_selection_grid_search, 'fit_forward_path', mock_fit_forward_path)
+
+    X, y = _create_training_data()
+    param_grid = {'sfs__k_features': [2, 4, 10], 'ridge2__alpha': [0.01, 10.0]}
+    search = ForwardSelectionGridSearch(estimator=_create_pipeline(), param_grid=param_grid, scoring='r2', cv=4)
+    search.fit(X, y)
+
+    # The path stops at the number of available features and grid points requiring more are skipped
+    assert fitted_k_features == [8] * 4
+    assert search.best_params_['sfs__k_features'] in [2, 4]
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import RBF, ConstantKernel
+
+from slamd.discovery.processing.experiment.mlmodel.incremental_gaussian_process_regressor import \
+    IncrementalGaussianProcessRegressor, MAX_STORED_FITS
+
+
+def _create_data():
+    rng = np.random.default_rng(42)
+    X = rng.uniform(0, 10, size=(14, 2))
+    y = (np.sin(X[:, 0]) + 0.1 * X[:, 1]).reshape(-1, 1)
+    return X, y
+
+
+def _create_regressor(lml_tolerance=0.1):
+    kernel = ConstantKernel(1.0, (1e-3, 1e3)) * RBF(10, (1e-2, 1e2))
+    return IncrementalGaussianProcessRegressor(kernel=kernel, n_restarts_optimizer=2, random_state=42,
+                                               lml_tolerance=lml_tolerance)
+
+
+def test_incremental_fit_matches_full_fit_with_same_kernel():
+    IncrementalGaussianProcessRegressor._previous_fits.clear()
+    X, y = _create_data()
+
+    first_regressor = _create_regressor(lml_tolerance=np.inf).fit(X[:12], y[:12])
+    assert first_regressor.incremental_update_ is False
+
+    # Rows in a different order plus two new labelled rows
+    order = np.array([13, 3, 0, 1, 2, 12, 4, 5, 6, 7, 8, 9, 10, 11])
+    regressor = _create_regressor(lml_tolerance=np.inf).fit(X[order], y[order])
+    assert regressor.incremental_update_ is True
+
+    expected_regressor = GaussianProcessRegressor(kernel=first_regressor.kernel_, optimizer=None).fit(X, y)
+    X_test = np.linspace(0, 10, 20).reshape(-1, 2)
+    prediction, uncertainty = regressor.predict(X_test, return_std=True)
+    expected_prediction, expected_uncertainty = expected_regressor.predict(X_test, return_std=True)
+
+    assert np.allclose(prediction, expected_prediction)
+    assert np.allclose(uncertainty, expected_uncertainty)
+    assert np.isclose(regressor.log_marginal_likelihood_value_, expected_regressor.log_marginal_likelihood_value_)
+    IncrementalGaussianProcessRegressor._previous_fits.clear()
+
+
+def test_incremental_fit_optimises_kernel_again_if_likelihood_drifts():
+    IncrementalGaussianProcessRegressor._previous_fits.clear()
+    X, y = _create_data()
+
+    _create_regressor(lml_tolerance=0).fit(X[:12], y[:12])
+    regressor = _create_regressor(lml_tolerance=0).fit(X, y)
+
+    assert regressor.incremental_update_ is False
+    IncrementalGaussianProcessRegressor._previous_fits.clear()
+
+
+def test_incremental_fit_does_not_reuse_fit_with_changed_labels():
+    IncrementalGaussianProcessRegressor._previous_fits.clear()
+    X, y = _create_data()
+
+    _create_regressor(lml_tolerance=np.inf).fit(X[:12], y[:12])
+    regressor = _create_regressor(lml_tolerance=np.inf).fit(X, y + 1)
+
+    assert regressor.incremental_update_ is False
+    IncrementalGaussianProcessRegressor._previous_fits.clear()
+
+
+def test_incremental_fit_can_run_in_several_threads():
+    IncrementalGaussianProcessRegressor._previous_fits.clear()
+    X, y = _create_data()
+
+    def fit(offset):
+        for n_rows in range(4, 14):
+            # The threads search and store previous fits at the same time
+            _create_regressor(lml_tolerance=np.inf).fit(X[:n_rows], y[:n_rows] + offset)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(fit, range(8)))
+
+    assert len(IncrementalGaussianProcessRegressor._previous_fits) == MAX_STORED_FITS
+    IncrementalGaussianProcessRegressor._previous_fits.clear()
@@ -0,0 +1,39 @@
+from lolopy import loloserver
+from py4j.java_gateway import JavaGateway
+
+from slamd.discovery.processing.experiment.mlmodel.lolopy_gateway import LolopyGateway
+
+
+def test_start_launches_gateway_with_configured_jvm_options(monkeypatch):
+    mock_launch_gateway_called_with = None
+
+    def mock_launch_gateway(classpath, javaopts, redirect_stdout, die_on_exit):
+        nonlocal mock_launch_gateway_called_with
+        mock_launch_gateway_called_with = javaopts
+        return 'Dummy Gateway'
+
+    monkeypatch.setattr(loloserver, '_lolopy_gateway', None)
+    monkeypatch.setattr(JavaGateway, 'launch_gateway', mock_launch_gateway)
+
+    LolopyGateway.start(jvm_memory='2g', jvm_threads=4)
+
+    assert loloserver._lolopy_gateway == 'Dummy Gateway'
+    assert mock_launch_gateway_called_with == ['-Xmx2g',
+                                               '-Djava.util.concurrent.ForkJoinPool.common.parallelism=4',
+                                               '-Dscala.concurrent.context.maxThreads=4']
+
+
+def test_start_reuses_running_gateway(monkeypatch):
+    mock_launch_gateway_called = False
+
+    def mock_launch_gateway(classpath, javaopts, redirect_stdout, die_on_exit):
+        nonlocal mock_launch_gateway_called
+        mock_launch_gateway_called = True
+
+    monkeypatch.setattr(loloserver, '_lolopy_gateway', 'Running Gateway')
+    monkeypatch.setattr(JavaGateway, 'launch_gateway', mock_launch_gateway)
+
+    LolopyGateway.start(jvm_memory='2g')
+
+    assert loloserver._lolopy_gateway == 'Running Gateway'
+    assert mock_launch_gateway_called is False
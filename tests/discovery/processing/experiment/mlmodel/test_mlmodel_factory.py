@@ -6,6 +6,8 @@ from sklearn.pipeline import Pipeline
 from slamd.discovery.processing.experiment.experiment_data import ExperimentData
 from slamd.discovery.processing.experiment.experiment_model import ExperimentModel
 from slamd.discovery.processing.experiment.mlmodel.mlmodel_factory import MLModelFactory
+from slamd.discovery.processing.experiment.mlmodel.parallel_restart_gaussian_process_regressor import \
+    ParallelRestartGaussianProcessRegressor
 from slamd.discovery.processing.experiment.mlmodel.slamd_random_forest import SlamdRandomForest
 from slamd.discovery.processing.experiment.mlmodel.tuned_gaussian_process_regressor import TunedGaussianProcessRegressor
 from slamd.discovery.processing.experiment.mlmodel.tuned_random_forest import TunedRandomForest
@@ -27,7 +29,7 @@ def _get_experiment_data(model):
 
 def test_mlmodel_factory_returns_correct_model_type():
     models = ExperimentModel.get_all_models()
-    expected_types = [SlamdRandomForest, GaussianProcessRegressor, Pipeline, Pipeline]
+    expected_types = [SlamdRandomForest, ParallelRestartGaussianProcessRegressor, Pipeline, Pipeline]
     assert len(models) == len(expected_types)
 
     for (model, expected_type) in zip(models, expected_types):
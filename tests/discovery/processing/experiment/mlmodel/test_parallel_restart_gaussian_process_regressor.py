@@ -0,0 +1,47 @@
+import numpy as np
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import RBF, ConstantKernel
+
+from slamd.discovery.processing.experiment.mlmodel.parallel_restart_gaussian_process_regressor import \
+    ParallelRestartGaussianProcessRegressor
+
+
+def _create_data():
+    rng = np.random.default_rng(42)
+    X = rng.uniform(0, 10, size=(20, 3))
+    y = (np.sin(X[:, 0]) + 0.1 * X[:, 1] - 0.2 * X[:, 2]).reshape(-1, 1)
+    return X, y
+
+
+def _create_kernel():
+    return ConstantKernel(1.0, (1e-3, 1e3)) * RBF(10, (1e-2, 1e2))
+
+
+def test_parallel_restarts_match_serial_restarts():
+    X, y = _create_data()
+
+    expected = GaussianProcessRegressor(kernel=_create_kernel(), n_restarts_optimizer=5, random_state=42).fit(X, y)
+    actual = ParallelRestartGaussianProcessRegressor(kernel=_create_kernel(), n_restarts_optimizer=5, random_state=42,
+                                                     n_restart_workers=3).fit(X, y)
+
+    assert actual.n_optimizer_runs_ == 6
+    assert np.allclose(actual.kernel_.theta, expected.kernel_.theta)
+    assert np.isclose(actual.log_marginal_likelihood_value_, expected.log_marginal_likelihood_value_)
+    assert np.allclose(actual.predict(X + 0.5), expected.predict(X + 0.5))
+
+
+def test_restarts_stop_early_once_converged():
+    X, y = _create_data()
+
+    regressor = ParallelRestartGaussianProcessRegressor(kernel=_create_kernel(), n_restarts_optimizer=9,
+                                                        random_state=42, n_restart_workers=2, restart_tolerance=1e-3,
+                                                        n_converged_restarts=2)
+    regressor.fit(X, y)
+
+    assert regressor.n_optimizer_runs_ < 10
+    assert regressor.n_optimizer_runs_ % 2 == 0
+
+    # The runs which were performed are the first runs of the serial optimisation
+    expected = GaussianProcessRegressor(kernel=_create_kernel(), n_restarts_optimizer=regressor.n_optimizer_runs_ - 1,
+                                        random_state=42).fit(X, y)
+    assert np.isclose(regressor.log_marginal_likelihood_value_, expected.log_marginal_likelihood_value_)
@@ -0,0 +1,72 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+from lolopy.learners import RandomForestRegressor
+
+from slamd.discovery.processing.experiment.mlmodel.slamd_random_forest import SlamdRandomForest, \
+    SlamdMultiTaskRandomForest, _pad_to_minimum_data_points
+
+
+def test_pad_to_minimum_data_points_repeats_data_set_four_times():
+    X = np.array([[1, 2], [3, 4], [5, 6]])
+    y = np.array([[1], [2], [3]])
+
+    padded_X, padded_y, weights = _pad_to_minimum_data_points(X, y, weights=np.array([1.0, 2.0, 3.0]))
+
+    assert np.array_equal(padded_X, np.tile(X, (4, 1)))
+    assert np.array_equal(padded_y.values, np.tile(y, (4, 1)))
+    assert weights.tolist() == [1.0, 2.0, 3.0] * 4
+
+
+def test_pad_to_minimum_data_points_accepts_one_dimensional_labels_without_weights():
+    X = np.arange(8).reshape(4, 2)
+    y = np.arange(4)
+
+    padded_X, padded_y, weights = _pad_to_minimum_data_points(X, y)
+
+    assert len(padded_X) == 4 * len(X)
+    assert padded_y[0].tolist() == [0, 1, 2, 3] * 4
+    assert weights is None
+
+
+def test_pad_to_minimum_data_points_does_not_change_large_data_sets():
+    X = np.arange(20).reshape(10, 2)
+    y = np.arange(10).reshape(-1, 1)
+
+    padded_X, padded_y, weights = _pad_to_minimum_data_points(X, y, weights=np.full(10, 2.0))
+
+    assert np.array_equal(padded_X, X)
+    assert np.array_equal(padded_y.values, y)
+    assert np.array_equal(weights, np.full(10, 2.0))
+
+
+def test_padded_forest_is_identical_to_forest_on_tiled_data():
+    rng = np.random.default_rng(42)
+    X = rng.uniform(0, 10, size=(5, 3))
+    y = (X[:, 0] + 2 * X[:, 1] - X[:, 2]).reshape(-1, 1)
+    X_test = rng.uniform(0, 10, size=(50, 3))
+
+    prediction, uncertainty = SlamdRandomForest().fit(X, y).predict(X_test, return_std=True)
+    tiled_forest = RandomForestRegressor()
+    tiled_forest.fit(np.tile(X, (4, 1)), pd.DataFrame(np.tile(y, (4, 1))), random_seed=42)
+    tiled_prediction, tiled_uncertainty = tiled_forest.predict(X_test, return_std=True)
+
+    assert np.array_equal(prediction, tiled_prediction)
+    assert np.array_equal(uncertainty, tiled_uncertainty)
+
+
+def test_pickling_leaves_forests_usable():
+    rng = np.random.default_rng(42)
+    X = rng.uniform(0, 10, size=(10, 3))
+    y = np.column_stack([X[:, 0] + X[:, 1], X[:, 2]])
+
+    for (forest, labels) in [(SlamdRandomForest(), y[:, :1]), (SlamdMultiTaskRandomForest(), y)]:
+        # Sending the same unfitted model to several worker processes pickles it repeatedly
+        pickle.dumps(forest)
+        forest = pickle.loads(pickle.dumps(forest)).fit(X, labels)
+
+        restored = pickle.loads(pickle.dumps(forest))
+        pickle.dumps(forest)
+
+        assert np.array_equal(np.asarray(restored.predict(X)), np.asarray(forest.predict(X)))
@@ -1,8 +1,18 @@
+import json
+import logging
+
 import pandas as pd
 import numpy as np
+import pytest
+from lolopy import loloserver
+from scipy.spatial import distance_matrix
 
-from slamd.discovery.processing.experiment.experiment_conductor import ExperimentConductor
+from slamd.common.slamd_utils import export_config, get_config_value
+from slamd.discovery.processing.experiment import stage_timer
+from slamd.discovery.processing.experiment.experiment_conductor import ExperimentConductor, WORKER_CONFIG_KEYS
 from slamd.discovery.processing.experiment.experiment_data import ExperimentData
+from slamd.discovery.processing.experiment.experiment_model import ExperimentModel
+from slamd.discovery.processing.experiment.mlmodel.mlmodel_factory import MLModelFactory
 
 
 def test_clip_predictions_for_one_target_no_threshold():
@@ -74,3 +84,209 @@ def test_clip_predictions_for_two_targets_partial_threshold():
     })
 
     assert np.array_equal(expected_output.values, clipped_prediction.values)
+
+
+def _get_two_target_experiment_data(model=ExperimentModel.GAUSSIAN_PROCESS.value):
+    df = pd.DataFrame({
+        'x': [1, 2, 3, 4, 5, 6, 7, 8],
+        'y': [6, np.nan, 7, 9, np.nan, 10, np.nan, np.nan],
+        'z': [5, np.nan, 3, np.nan, 2, 1, np.nan, np.nan]
+    })
+
+    return ExperimentData(
+        dataframe=df,
+        model=model,
+        target_names=['y', 'z'],
+        feature_names=['x']
+    )
+
+
+def test_calculate_utility_clips_norms_inverts_and_weighs_all_targets():
+    df = pd.DataFrame({
+        'x': [1, 2, 3, 4, 5, 6],
+        'y': [1, 3, np.nan, np.nan, np.nan, np.nan],
+        'z': [4, 2, 6, np.nan, np.nan, np.nan],
+        'a': [1, 2, 3, 4, np.nan, 8]
+    })
+    experiment = ExperimentData(dataframe=df, curiosity=0.5, target_names=['y', 'z'], target_weights=[2, 0.5],
+                                target_thresholds=[2.5, None], target_max_or_min=['max', 'min'], apriori_names=['a'],
+                                apriori_weights=[3], apriori_max_or_min=['min'], feature_names=['x'])
+    index_predicted = pd.Index([2, 3, 4, 5])
+    experiment.prediction = pd.DataFrame({'y': [2, 5, 1, 4], 'z': [6, 3, 7, 1]}, index=index_predicted, dtype=float)
+    experiment.uncertainty = pd.DataFrame({'y': [1, 2, 3, 4], 'z': [0, 1, 1, 2]}, index=index_predicted, dtype=float)
+
+    ExperimentConductor._calculate_utility(experiment)
+
+    y = (np.array([2, 2.5, 1, 2.5]) - 2) / np.sqrt(2) * 2
+    z = -(np.array([6, 3, 7, 1]) - 4) / 2 * 0.5
+    uncertainty = np.array([1, 2, 3, 4]) / np.sqrt(2) * 2 + np.array([0, 1, 1, 2]) / 2 * 0.5
+    a = df['a']
+    # The missing a priori value counts as 0
+    apriori = np.nan_to_num(-(a.loc[index_predicted].values - a.mean()) / a.std() * 3)
+    expected_utility = apriori + y + z + 0.5 * uncertainty
+
+    assert experiment.utility.index.equals(index_predicted)
+    assert np.allclose(experiment.utility.values, expected_utility)
+
+
+@pytest.fixture()
+def fit_executor():
+    yield
+    ExperimentConductor.shutdown_fit_executor()
+
+
+def _query_worker_state():
+    return get_config_value('EXPERIMENT_FIT_WORKERS'), loloserver._lolopy_gateway is not None
+
+
+# The targets share one regressor, which is pickled for each of them when it is sent to the worker processes
+@pytest.mark.parametrize('model', [ExperimentModel.GAUSSIAN_PROCESS.value, ExperimentModel.RANDOM_FOREST.value])
+def test_fit_model_and_predict_in_parallel_matches_sequential_fit(app, fit_executor, model):
+    sequential_experiment = _get_two_target_experiment_data(model)
+    ExperimentConductor._fit_model_and_predict(sequential_experiment)
+
+    parallel_experiment = _get_two_target_experiment_data(model)
+    app.config['EXPERIMENT_FIT_WORKERS'] = 2
+    with app.app_context():
+        ExperimentConductor._fit_model_and_predict(parallel_experiment)
+
+    assert np.allclose(parallel_experiment.prediction.values, sequential_experiment.prediction.values)
+    assert np.allclose(parallel_experiment.uncertainty.values, sequential_experiment.uncertainty.values)
+
+
+def test_fit_executor_is_reused_and_initialised_with_app_config(app, fit_executor):
+    app.config['EXPERIMENT_FIT_WORKERS'] = 2
+    app.config['GP_INCREMENTAL_LML_TOLERANCE'] = 0.25
+    with app.app_context():
+        executor = ExperimentConductor._get_fit_executor()
+        assert ExperimentConductor._get_fit_executor() is executor
+
+    assert executor.submit(get_config_value, 'GP_INCREMENTAL_LML_TOLERANCE').result() == 0.25
+
+
+def test_fit_workers_fit_in_process_and_start_no_jvm_until_they_receive_a_random_forest(app, fit_executor):
+    app.config['EXPERIMENT_FIT_WORKERS'] = 2
+    with app.app_context():
+        executor = ExperimentConductor._get_fit_executor()
+
+    # A nested pool would keep the worker from exiting
+    assert executor.submit(_query_worker_state).result() == (1, False)
+
+
+def test_shutdown_fit_executor_stops_the_workers(app):
+    app.config['EXPERIMENT_FIT_WORKERS'] = 2
+    with app.app_context():
+        executor = ExperimentConductor._get_fit_executor()
+    executor.submit(get_config_value, 'EXPERIMENT_FIT_WORKERS').result()
+    processes = list(executor._processes.values())
+
+    ExperimentConductor.shutdown_fit_executor()
+
+    assert ExperimentConductor._fit_executor is None
+    assert not any(process.is_alive() for process in processes)
+
+
+def test_worker_config_leaves_out_secrets(app):
+    app.config['SECRET_KEY'] = 'secret'
+    app.config['OPENAI_API_TOKEN'] = 'token'
+    with app.app_context():
+        worker_config = export_config(WORKER_CONFIG_KEYS)
+
+    assert worker_config['EXPERIMENT_FIT_WORKERS'] == 1
+    assert 'SECRET_KEY' not in worker_config
+    assert 'OPENAI_API_TOKEN' not in worker_config
+
+
+def test_fit_model_and_predict_shares_model_for_targets_labelled_in_the_same_rows(app):
+    df = pd.DataFrame({
+        'x': [1, 2, 3, 4, 5, 6, 7, 8],
+        'y': [6, np.nan, 7, 9, np.nan, np.nan, np.nan, np.nan],
+        'z': [5, np.nan, 3, 2, np.nan, np.nan, np.nan, np.nan],
+        'w': [1, 4, 2, 3, np.nan, np.nan, np.nan, np.nan]
+    })
+    experiment = ExperimentData(dataframe=df, model=ExperimentModel.GAUSSIAN_PROCESS.value,
+                                target_names=['y', 'z', 'w'], feature_names=['x'])
+
+    app.config['EXPERIMENT_SHARED_FIT'] = True
+    with app.app_context():
+        assert ExperimentConductor._select_targets_for_shared_fit(experiment) == ['y', 'z']
+        ExperimentConductor._fit_model_and_predict(experiment)
+
+    index_labelled = [0, 2, 3]
+    shared_model = MLModelFactory.initialize_shared_model(experiment)
+    shared_model.fit(df.loc[index_labelled, ['x']].values, df.loc[index_labelled, ['y', 'z']].values)
+    expected_prediction, expected_uncertainty = shared_model.predict(df.loc[[1, 4, 5, 6, 7], ['x']].values,
+                                                                     return_std=True)
+
+    assert np.allclose(experiment.prediction.loc[[1, 4, 5, 6, 7], ['y', 'z']].values, expected_prediction)
+    assert np.allclose(experiment.uncertainty.loc[[1, 4, 5, 6, 7], ['y', 'z']].values, expected_uncertainty)
+    # Target w is also labelled in row 1 and therefore fitted on its own
+    assert experiment.prediction.loc[1, 'w'] == 4
+    assert experiment.uncertainty.loc[1, 'w'] == 0
+
+
+def test_shared_fit_keeps_uncertainty_of_targets_on_different_scales(app):
+    rng = np.random.default_rng(42)
+    x = rng.uniform(0, 10, size=(24, 2))
+    labelled = np.arange(24) % 2 == 0
+    # Like strength in MPa and slump in mm: the targets scatter on different scales
+    df = pd.DataFrame({
+        'x1': x[:, 0],
+        'x2': x[:, 1],
+        'y': np.where(labelled, 40 + 5 * np.sin(x[:, 0]) + rng.normal(0, 2, 24), np.nan),
+        'z': np.where(labelled, 100 + 20 * np.cos(x[:, 1]) + rng.normal(0, 10, 24), np.nan)
+    })
+
+    def fit_uncertainty(shared_fit):
+        experiment = ExperimentData(dataframe=df, model=ExperimentModel.GAUSSIAN_PROCESS.value,
+                                    target_names=['y', 'z'], feature_names=['x1', 'x2'])
+        app.config['EXPERIMENT_SHARED_FIT'] = shared_fit
+        with app.app_context():
+            ExperimentConductor._fit_model_and_predict(experiment)
+        return experiment.uncertainty.loc[np.flatnonzero(~labelled)].mean()
+
+    separate_uncertainty = fit_uncertainty(False)
+    shared_uncertainty = fit_uncertainty(True)
+
+    assert separate_uncertainty['z'] > 2 * separate_uncertainty['y']
+    for target in ['y', 'z']:
+        assert 0.7 < shared_uncertainty[target] / separate_uncertainty[target] < 1.5, target
+
+
+def test_run_records_timings_of_stages_and_fits(app, caplog):
+    df = pd.DataFrame({
+        'x': [1, 2, 3, 4, 5, 6, 7, 8],
+        'y': [6, np.nan, 7, 9, np.nan, 10, np.nan, np.nan],
+        'z': [5, np.nan, 3, np.nan, 2, 1, np.nan, np.nan]
+    })
+    experiment = ExperimentData(dataframe=df, model=ExperimentModel.GAUSSIAN_PROCESS.value, curiosity=1.0,
+                                feature_names=['x'], target_names=['y', 'z'], target_weights=[1.0, 1.0],
+                                target_thresholds=[None, None], target_max_or_min=['max', 'min'])
+
+    with app.app_context(), caplog.at_level(logging.INFO, logger=stage_timer.__name__):
+        ExperimentConductor.run(experiment)
+
+    assert [(timing['stage'], timing.get('targets')) for timing in experiment.timings] == [
+        ('preprocess', None), ('create_model', ['y', 'z']), ('fit', ['y']), ('predict', ['y']), ('fit', ['z']),
+        ('predict', ['z']), ('utility', None), ('novelty', None), ('output_table', None), ('scatter_plot', None)
+    ]
+    assert all(timing['seconds'] >= 0 for timing in experiment.timings)
+    assert experiment.timings[2]['rows'] == 4
+
+    [record] = [record for record in caplog.records if hasattr(record, 'stage_timings')]
+    assert record.stage_timings['operation'] == 'run'
+    assert record.stage_timings['stages'] == experiment.timings
+    assert json.loads(record.getMessage().split(': ', 1)[1]) == record.stage_timings
+
+
+def test_nearest_neighbour_distances_match_dense_distance_matrix():
+    rng = np.random.default_rng(42)
+
+    for n_dims in [3, 40]:
+        reference_points = rng.normal(size=(50, n_dims))
+        points = rng.normal(size=(2500, n_dims))
+
+        expected = distance_matrix(points, reference_points).min(axis=1)
+        actual = ExperimentConductor._nearest_neighbour_distances(points, reference_points)
+
+        assert np.allclose(actual, expected)
@@ -1,3 +1,5 @@
+import pickle
+
 import pandas as pd
 import numpy as np
 
@@ -40,3 +42,27 @@ def test_index_predicted():
     data = _get_experiment_data()
 
     assert tuple(data.index_predicted) == (1, 2, 3, 4)
+
+
+def test_label_indexes_are_computed_once_until_cache_is_invalidated():
+    data = _get_experiment_data()
+
+    assert data.index_predicted is data.index_predicted
+    assert data.targets_df is data.targets_df
+
+    data.dataframe.loc[1, 'y'] = 7
+    assert tuple(data.index_none_labelled) == (1, 4)
+
+    data.invalidate_cache()
+    assert tuple(data.index_none_labelled) == (4,)
+    assert tuple(data.index_partially_labelled) == (1, 2, 3)
+
+
+def test_cache_is_not_pickled():
+    data = _get_experiment_data()
+    assert tuple(data.index_all_labelled) == (0, 5)
+
+    unpickled_data = pickle.loads(pickle.dumps(data))
+
+    assert unpickled_data._cache == {}
+    assert tuple(unpickled_data.index_all_labelled) == (0, 5)
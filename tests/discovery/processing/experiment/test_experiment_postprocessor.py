@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from slamd.discovery.processing.experiment.experiment_data import ExperimentData
+from slamd.discovery.processing.experiment.experiment_model import ExperimentModel
+from slamd.discovery.processing.experiment.experiment_postprocessor import ExperimentPostprocessor
+from slamd.discovery.processing.experiment.experiment_preprocessor import ExperimentPreprocessor
+
+
+def _experiment_factory(n_rows=200):
+    rng = np.random.default_rng(42)
+    dataframe = pd.DataFrame({
+        'Idx_Sample': np.arange(n_rows),
+        'f1': rng.normal(size=n_rows),
+        'f2': rng.normal(size=n_rows),
+        't1': np.nan,
+        'a1': rng.normal(size=n_rows),
+        'Comment': [f'Sample {i}' for i in range(n_rows)],
+    })
+    dataframe.loc[:9, 't1'] = rng.normal(size=10)
+
+    exp = ExperimentData(dataframe=dataframe, model=ExperimentModel.RANDOM_FOREST.value, curiosity=1.0,
+                         feature_names=['f1', 'f2'], target_names=['t1'], target_weights=[1.0],
+                         target_thresholds=[None], target_max_or_min=['max'], apriori_names=['a1'],
+                         apriori_weights=[1.0], apriori_thresholds=[None], apriori_max_or_min=['max'])
+    ExperimentPreprocessor.preprocess(exp)
+
+    exp.prediction = pd.DataFrame({'t1': rng.normal(size=len(exp.index_predicted))}, index=exp.index_predicted)
+    exp.uncertainty = pd.DataFrame({'t1': rng.uniform(size=len(exp.index_predicted))}, index=exp.index_predicted)
+    # Include ties to check that the order of the top rows does not depend on the partial selection
+    exp.utility = pd.Series(rng.integers(0, 50, size=len(exp.index_predicted)) / 10, index=exp.index_predicted)
+    return exp
+
+
+def test_create_output_table_sorts_all_rows_by_utility():
+    exp = _experiment_factory()
+
+    df = ExperimentPostprocessor.create_output_table(exp)
+
+    assert len(df) == 190
+    assert list(df.columns) == ['Row number', 'Utility', 't1', 'Uncertainty (t1)', 'a1', 'Idx_Sample', 'f1', 'f2',
+                                'Comment']
+    assert list(df['Row number']) == list(range(1, 191))
+    assert df['Utility'].is_monotonic_decreasing
+
+
+def test_create_output_table_with_top_k_returns_top_rows_of_complete_table():
+    exp = _experiment_factory()
+    complete_df = ExperimentPostprocessor.create_output_table(exp)
+
+    df = ExperimentPostprocessor.create_output_table(exp, top_k=25)
+
+    assert len(df) == 25
+    pd.testing.assert_frame_equal(df, complete_df.iloc[:25])
+    # Rows with the same utility keep the order of the dataset
+    for (_, rows) in df.groupby('Utility'):
+        assert rows['Idx_Sample'].is_monotonic_increasing
+
+
+def test_create_output_table_with_top_k_larger_than_number_of_rows_returns_all_rows():
+    exp = _experiment_factory(n_rows=30)
+
+    pd.testing.assert_frame_equal(ExperimentPostprocessor.create_output_table(exp, top_k=100),
+                                  ExperimentPostprocessor.create_output_table(exp))
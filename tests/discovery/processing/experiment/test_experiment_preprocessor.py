@@ -203,3 +203,49 @@ def test_filter_missing_inputs_multiple():
     ExperimentPreprocessor.filter_missing_inputs(experiment)
 
     assert tuple(experiment.dataframe.columns) == ('u', 'w')
+
+
+def test_filter_apriori_thresholds_keeps_mapping_to_uploaded_rows():
+    df = pd.DataFrame()
+    df['name'] = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
+    df['u'] = [1, 2, 3, 4, 5, 6, 7, 8]
+    df['x'] = [np.nan, np.nan, np.nan, 4, np.nan, np.nan, 7, 8]
+
+    experiment = ExperimentData(dataframe=df, target_names=['x'], apriori_names=['u'], apriori_thresholds=[4],
+                                apriori_max_or_min=['max'])
+
+    assert experiment.orig_data is df
+    assert list(experiment.dataframe.columns) == ['u', 'x']
+
+    ExperimentPreprocessor.filter_apriori_with_thresholds_and_update_orig_data(experiment)
+    orig_data = experiment.orig_data_of_predicted_rows
+
+    assert list(experiment.orig_index) == [3, 4, 5, 6, 7]
+    assert list(orig_data.index) == [1, 2]
+    assert list(orig_data['name']) == ['e', 'f']
+
+
+def test_preprocess_filters_rows_before_dropping_features_with_missing_values():
+    df = pd.DataFrame({
+        'f1': [1.0, 2.0, np.nan, 4.0, 5.0, 6.0],
+        'f2': [1.0, np.nan, 3.0, 4.0, 5.0, 6.0],
+        'f3': ['a', 'b', 'c', 'a', 'b', 'c'],
+        't': [1.0, 2.0, np.nan, np.nan, np.nan, np.nan],
+        'a1': [5, 5, 1, 5, 5, 5],
+        'a2': [1, 1, 1, 1, np.nan, 9],
+    })
+    experiment = ExperimentData(dataframe=df, model=ExperimentModel.GAUSSIAN_PROCESS.value, curiosity=1.0,
+                                feature_names=['f1', 'f2', 'f3'], target_names=['t'], target_weights=[1.0],
+                                target_thresholds=[None], target_max_or_min=['max'], apriori_names=['a1', 'a2'],
+                                apriori_weights=[1.0, 1.0], apriori_thresholds=[3, 5],
+                                apriori_max_or_min=['max', 'min'])
+
+    ExperimentPreprocessor.preprocess(experiment)
+
+    # Row 2 misses the threshold of a1 and row 5 the one of a2, the missing value of a2 in row 4 is ignored
+    assert list(experiment.orig_index) == [0, 1, 3, 4]
+    assert list(experiment.dataframe.index) == [0, 1, 2, 3]
+    # The missing value of f1 is only in a dropped row, f2 misses a value in a labelled row
+    assert experiment.feature_names == ['f1', 'f3']
+    assert list(experiment.dataframe.columns) == ['f1', 'f3', 't', 'a1', 'a2']
+    assert list(experiment.dataframe['f3']) == [0, 1, 0, 1]
@@ -1,12 +1,30 @@
+import base64
 import json
 
 import numpy as np
 import pandas as pd
 
-from slamd.discovery.processing.experiment.plot_generator import PlotGenerator
+from slamd.discovery.processing.experiment.plot_generator import PlotGenerator, MAX_SCATTER_POINTS, TOP_UTILITY_POINTS
 from tests.discovery.processing.experiment.test_plot_json_data import SCATTER_1DIM_JSON, SCATTER_2DIM_JSON, TSNE_3DIM_JSON
 
 
+def _load_plot(plot_json):
+    return _decode_typed_arrays(json.loads(plot_json))
+
+
+def _decode_typed_arrays(value):
+    if isinstance(value, dict) and 'bdata' in value:
+        array = np.frombuffer(base64.b64decode(value['bdata']), dtype=f'<{value["dtype"]}')
+        if 'shape' in value:
+            array = array.reshape([int(size) for size in value['shape'].split(',')])
+        return array.tolist()
+    if isinstance(value, dict):
+        return {key: _decode_typed_arrays(item) for (key, item) in value.items()}
+    if isinstance(value, list):
+        return [_decode_typed_arrays(item) for item in value]
+    return value
+
+
 def _plot_df_factory():
     plot_df = pd.DataFrame({
         't1': np.arange(20),
@@ -36,7 +54,7 @@ def test_create_target_scatter_plot_1dim():
     plot_df = _plot_df_factory().loc[:, ['t1', 'Uncertainty (t1)', 'Utility', 'Row number']]
 
     expected_output = SCATTER_1DIM_JSON
-    actual_output = json.loads(PlotGenerator.create_target_scatter_plot(plot_df))
+    actual_output = _load_plot(PlotGenerator.create_target_scatter_plot(plot_df))
 
     assert expected_output == actual_output
 
@@ -45,7 +63,7 @@ def test_create_target_scatter_plot_2dim():
     plot_df = _plot_df_factory().loc[:, ['t1', 't2',  'Uncertainty (t1)', 'Uncertainty (t2)', 'Utility', 'Row number']]
 
     expected_output = SCATTER_2DIM_JSON
-    actual_output = json.loads(PlotGenerator.create_target_scatter_plot(plot_df))
+    actual_output = _load_plot(PlotGenerator.create_target_scatter_plot(plot_df))
 
     assert expected_output == actual_output
 
@@ -54,6 +72,70 @@ def test_create_tsne_input_space_plot():
     plot_df = _plot_df_factory().loc[:, ['f1', 'f2', 'f3', 'Utility', 'Row number', 'is_train_data']]
 
     expected_output = TSNE_3DIM_JSON
-    actual_output = json.loads(PlotGenerator.create_tsne_input_space_plot(plot_df))
+    actual_output = _load_plot(PlotGenerator.create_tsne_input_space_plot(plot_df))
 
     assert expected_output == actual_output
+
+
+def test_create_target_scatter_plot_downsamples_large_data_and_uses_webgl():
+    rng = np.random.default_rng(42)
+    n_rows = 12000
+    plot_df = pd.DataFrame({
+        't1': rng.normal(size=n_rows),
+        'Utility': rng.normal(size=n_rows),
+    })
+    plot_df['Uncertainty (t1)'] = rng.uniform(size=n_rows)
+    plot_df = plot_df.sort_values(by='Utility', ascending=False)
+    plot_df['Row number'] = range(1, n_rows + 1)
+
+    plot = _load_plot(PlotGenerator.create_target_scatter_plot(plot_df))
+
+    trace = plot['data'][0]
+    row_numbers = set(trace['customdata'])
+    assert trace['type'] == 'scattergl'
+    assert len(trace['x']) == MAX_SCATTER_POINTS
+    assert set(range(1, TOP_UTILITY_POINTS + 1)) <= row_numbers
+    assert plot_df.loc[plot_df['t1'].idxmin(), 'Row number'] in row_numbers
+    assert plot_df.loc[plot_df['t1'].idxmax(), 'Row number'] in row_numbers
+    assert f'showing {MAX_SCATTER_POINTS} of {n_rows} rows' in plot['layout']['title']['text']
+
+
+def test_create_target_scatter_plot_creates_single_splom_trace_for_scatter_matrix():
+    rng = np.random.default_rng(42)
+    n_rows = 12000
+    plot_df = pd.DataFrame({
+        't1': rng.normal(size=n_rows),
+        't2': rng.normal(size=n_rows),
+        't3': rng.normal(size=n_rows),
+        'Utility': rng.normal(size=n_rows),
+    })
+    plot_df['Uncertainty (t1)'] = rng.uniform(size=n_rows)
+    plot_df['Uncertainty (t2)'] = rng.uniform(size=n_rows)
+    plot_df = plot_df.sort_values(by='Utility', ascending=False)
+    plot_df['Row number'] = range(1, n_rows + 1)
+
+    plot = _load_plot(PlotGenerator.create_target_scatter_plot(plot_df))
+
+    assert len(plot['data']) == 1
+    trace = plot['data'][0]
+    row_numbers = {row[0] for row in trace['customdata']}
+    assert trace['type'] == 'splom'
+    assert [dimension['label'] for dimension in trace['dimensions']] == ['t1', 't2', 't3']
+    assert all(len(dimension['values']) == MAX_SCATTER_POINTS for dimension in trace['dimensions'])
+    assert len(trace['customdata'][0]) == 3
+    assert set(range(1, TOP_UTILITY_POINTS + 1)) <= row_numbers
+    for column in ['t1', 't2', 't3']:
+        assert plot_df.loc[plot_df[column].idxmin(), 'Row number'] in row_numbers
+        assert plot_df.loc[plot_df[column].idxmax(), 'Row number'] in row_numbers
+    assert f'showing {MAX_SCATTER_POINTS} of {n_rows} rows' in plot['layout']['title']['text']
+
+
+def test_create_target_scatter_plot_encodes_numeric_arrays_as_typed_arrays():
+    plot_df = _plot_df_factory().loc[:, ['t1', 't2', 'Uncertainty (t1)', 'Uncertainty (t2)', 'Utility', 'Row number']]
+
+    trace = json.loads(PlotGenerator.create_target_scatter_plot(plot_df))['data'][0]
+
+    assert trace['marker']['color']['dtype'] == 'f8'
+    assert trace['customdata']['dtype'] == 'i4'
+    assert trace['customdata']['shape'] == '20,3'
+    assert _decode_typed_arrays(trace['dimensions'][0]['values']) == list(range(20))
@@ -246,13 +246,21 @@ SCATTER_1DIM_JSON = {'data': [{'customdata': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10,
     'title': {'text': 'Scatter plot of target properties'}, 'xaxis': {'title': {'text': 't1'}},
     'yaxis': {'title': {'text': 'Utility'}}, 'height': 1000}}
 # This file contains the json data for test_create_target_scatter_plot_2dim(), as a python dict
-SCATTER_2DIM_JSON = {'data': [{'customdata': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19],
-                               'error_x': {'array': [1, 2, 3, 1, 2, 3, 1, 2, 3, 1, 2, 3, 1, 2, 3, 1, 2, 3, 1, 2],
-                                           'color': 'lightgray', 'thickness': 1, 'type': 'data'},
-                               'error_y': {'array': [2, 6, 4, 2, 6, 4, 2, 6, 4, 2, 6, 4, 2, 6, 4, 2, 6, 4, 2, 6],
-                                           'color': 'lightgray', 'thickness': 1, 'type': 'data'},
+SCATTER_2DIM_JSON = {'data': [{'customdata': [[0, 1, 2], [1, 2, 6], [2, 3, 4], [3, 1, 2], [4, 2, 6], [5, 3, 4],
+                                              [6, 1, 2], [7, 2, 6], [8, 3, 4], [9, 1, 2], [10, 2, 6], [11, 3, 4],
+                                              [12, 1, 2], [13, 2, 6], [14, 3, 4], [15, 1, 2], [16, 2, 6], [17, 3, 4],
+                                              [18, 1, 2], [19, 2, 6]],
+                               'diagonal': {'visible': False},
+                               'dimensions': [{'label': 't1',
+                                               'values': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16,
+                                                          17, 18, 19]},
+                                              {'label': 't2',
+                                               'values': [0, 2, 4, 6, 8, 10, 12, 14, 16, 18, 20, 22, 24, 26, 28, 30,
+                                                          32, 34, 36, 38]}],
                                'hoverlabel': {'bgcolor': 'black'},
-                               'hovertemplate': 'Row number: %{customdata}, X: %{x:.2f}, Y: %{y:.2f}, Utility: %{marker.color:.2f}',
+                               'hovertemplate': 'Row number: %{customdata[0]}, X: %{x:.2f}, Y: %{y:.2f}, Utility: '
+                                                '%{marker.color:.2f}<br>Uncertainty (t1): %{customdata[1]:.2f}'
+                                                '<br>Uncertainty (t2): %{customdata[2]:.2f}',
                                'marker': {'color': [4.0, 3.6842105263157894, 3.3684210526315788, 3.0526315789473686,
                                                     2.736842105263158, 2.4210526315789473, 2.105263157894737,
                                                     1.7894736842105265, 1.473684210526316, 1.1578947368421053,
@@ -268,10 +276,7 @@ SCATTER_2DIM_JSON = {'data': [{'customdata': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10,
                                                          [0.6666666666666666, '#ed7953'],
                                                          [0.7777777777777778, '#fb9f3a'],
                                                          [0.8888888888888888, '#fdca26'], [1.0, '#f0f921']], 'size': 7},
-                               'mode': 'markers', 'name': '',
-                               'x': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19],
-                               'y': [0, 2, 4, 6, 8, 10, 12, 14, 16, 18, 20, 22, 24, 26, 28, 30, 32, 34, 36, 38],
-                               'type': 'scatter', 'xaxis': 'x', 'yaxis': 'y'}], 'layout': {'template': {'data': {
+                               'name': '', 'showupperhalf': False, 'type': 'splom'}], 'layout': {'template': {'data': {
     'histogram2dcontour': [{'type': 'histogram2dcontour', 'colorbar': {'outlinewidth': 0, 'ticks': ''},
                             'colorscale': [[0.0, '#0d0887'], [0.1111111111111111, '#46039f'],
                                            [0.2222222222222222, '#7201a8'], [0.3333333333333333, '#9c179e'],
@@ -437,16 +442,6 @@ SCATTER_2DIM_JSON = {'data': [{'customdata': [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10,
                                                                       'subunitcolor': 'white', 'showland': True,
                                                                       'showlakes': True, 'lakecolor': 'white'},
                                                               'title': {'x': 0.05}, 'mapbox': {'style': 'light'}}},
-    'xaxis': {'anchor': 'y',
-              'domain': [0.0,
-                         1.0],
-              'title': {
-                  'text': 't1'}},
-    'yaxis': {'anchor': 'x',
-              'domain': [0.0,
-                         1.0],
-              'title': {
-                  'text': 't2'}},
     'title': {
         'text': 'Scatter matrix of target properties'},
     'showlegend': False,
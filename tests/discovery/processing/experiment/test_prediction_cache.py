@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from slamd.discovery.processing.experiment.experiment_data import ExperimentData
+from slamd.discovery.processing.experiment.prediction_cache import PredictionCache
+
+
+def _get_experiment_data(labels=(6, np.nan, np.nan, 9)):
+    df = pd.DataFrame({
+        'x': [1, 2, 3, 4],
+        'y': list(labels)
+    })
+
+    exp = ExperimentData(dataframe=df, model='model', target_names=['y'], feature_names=['x'])
+    exp.prediction = pd.DataFrame({'y': [7.0, 8.0]}, index=[1, 2])
+    exp.uncertainty = pd.DataFrame({'y': [0.5, 0.25]}, index=[1, 2])
+    return exp
+
+
+def test_prediction_cache_is_disabled_without_memory_budget():
+    exp = _get_experiment_data()
+
+    assert PredictionCache.create_key(exp) is None
+    assert PredictionCache.load(None, exp) is False
+
+
+def test_prediction_cache_returns_saved_prediction_for_same_data(app):
+    PredictionCache.clear()
+    app.config['PREDICTION_CACHE_MAX_BYTES'] = 1024 * 1024
+
+    with app.app_context():
+        exp = _get_experiment_data()
+        PredictionCache.save(PredictionCache.create_key(exp), exp)
+
+        same_exp = _get_experiment_data()
+        same_exp.prediction = None
+        same_exp.uncertainty = None
+        assert PredictionCache.load(PredictionCache.create_key(same_exp), same_exp) is True
+        assert same_exp.prediction.equals(exp.prediction)
+        assert same_exp.uncertainty.equals(exp.uncertainty)
+
+        other_exp = _get_experiment_data(labels=(6, np.nan, np.nan, 10))
+        assert PredictionCache.load(PredictionCache.create_key(other_exp), other_exp) is False
+
+
+def test_prediction_cache_key_depends_on_configuration_of_fit(app):
+    app.config['PREDICTION_CACHE_MAX_BYTES'] = 1024 * 1024
+
+    with app.app_context():
+        key = PredictionCache.create_key(_get_experiment_data())
+        for (name, value) in [('GP_INCREMENTAL_FIT', True), ('GP_INCREMENTAL_LML_TOLERANCE', 0.5)]:
+            app.config[name] = value
+            changed_key = PredictionCache.create_key(_get_experiment_data())
+            assert changed_key != key, name
+            key = changed_key
+
+
+def test_prediction_cache_evicts_least_recently_used_entries(app):
+    PredictionCache.clear()
+    exp = _get_experiment_data()
+    other_exp = _get_experiment_data(labels=(6, np.nan, np.nan, 10))
+    entry_size = int(exp.prediction.memory_usage(deep=True).sum() + exp.uncertainty.memory_usage(deep=True).sum())
+    app.config['PREDICTION_CACHE_MAX_BYTES'] = entry_size
+
+    with app.app_context():
+        key = PredictionCache.create_key(exp)
+        other_key = PredictionCache.create_key(other_exp)
+        PredictionCache.save(key, exp)
+        PredictionCache.save(other_key, other_exp)
+
+        assert PredictionCache.load(key, exp) is False
+        assert PredictionCache.load(other_key, other_exp) is True
+
+    PredictionCache.clear()
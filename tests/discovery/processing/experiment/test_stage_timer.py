@@ -0,0 +1,51 @@
+import pytest
+
+from slamd.discovery.processing.experiment import stage_timer
+from slamd.discovery.processing.experiment.stage_timer import measure_stage
+
+
+def test_measure_stage_appends_duration_and_details():
+    timings = []
+
+    with measure_stage(timings, 'fit', targets=['y']):
+        pass
+
+    [timing] = timings
+    assert timing['stage'] == 'fit'
+    assert timing['targets'] == ['y']
+    assert timing['seconds'] >= 0
+    assert timing['process_peak_memory_mb'] is None or timing['process_peak_memory_mb'] > 0
+    assert timing['peak_memory_increase_mb'] is None or timing['peak_memory_increase_mb'] >= 0
+
+
+def test_measure_stage_records_increase_of_peak_memory(monkeypatch):
+    peak_memory = iter([100.0, 250.5])
+    monkeypatch.setattr(stage_timer, 'process_peak_memory_mb', lambda: next(peak_memory))
+    timings = []
+
+    with measure_stage(timings, 'fit'):
+        pass
+
+    assert timings[0]['process_peak_memory_mb'] == 250.5
+    assert timings[0]['peak_memory_increase_mb'] == 150.5
+
+
+def test_measure_stage_records_failing_stage():
+    timings = []
+
+    with pytest.raises(ValueError):
+        with measure_stage(timings, 'utility'):
+            raise ValueError()
+
+    assert [timing['stage'] for timing in timings] == ['utility']
+
+
+def test_peak_memory_is_none_without_resource_module(monkeypatch):
+    monkeypatch.setattr(stage_timer, 'resource', None)
+    timings = []
+
+    with measure_stage(timings, 'fit'):
+        pass
+
+    assert stage_timer.process_peak_memory_mb() is None
+    assert timings[0]['peak_memory_increase_mb'] is None
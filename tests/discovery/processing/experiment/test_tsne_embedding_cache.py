@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+from slamd.discovery.processing.experiment import tsne_embedding_cache
+from slamd.discovery.processing.experiment.plot_generator import PlotGenerator
+from slamd.discovery.processing.experiment.tsne_embedding_cache import TSNEEmbeddingCache
+
+
+def _mock_compute_tsne_embedding(monkeypatch):
+    computed_features = []
+
+    def mock_compute_tsne_embedding(features):
+        computed_features.append(features)
+        return np.column_stack([features.values.sum(axis=1), np.arange(len(features))]).astype(float)
+
+    monkeypatch.setattr(tsne_embedding_cache, 'compute_tsne_embedding', mock_compute_tsne_embedding)
+    return computed_features
+
+
+def _create_plot_df(utility):
+    plot_df = pd.DataFrame({'f1': [0.5, -1.0, 0.5], 'f2': [1.0, 0.0, -1.0]})
+    plot_df['is_train_data'] = ['Labelled', 'Predicted', 'Predicted']
+    plot_df['Utility'] = utility
+    plot_df = plot_df.sort_values(by='Utility', ascending=False)
+    plot_df.insert(loc=0, column='Row number', value=list(range(1, len(plot_df) + 1)))
+    return plot_df
+
+
+def test_tsne_embedding_is_reused_when_only_utility_changes(app, monkeypatch):
+    TSNEEmbeddingCache.clear()
+    computed_features = _mock_compute_tsne_embedding(monkeypatch)
+    app.config['TSNE_CACHE_MAX_ENTRIES'] = 2
+
+    with app.app_context():
+        first_plot = PlotGenerator.create_tsne_input_space_plot(_create_plot_df([-np.inf, 1.0, 2.0]))
+        second_plot = PlotGenerator.create_tsne_input_space_plot(_create_plot_df([-np.inf, 2.0, 1.0]))
+
+    assert len(computed_features) == 1
+    assert list(computed_features[0].index) == [0, 1, 2]
+    assert first_plot != second_plot
+
+
+def test_tsne_embedding_computed_in_background_is_served_from_cache(app, monkeypatch):
+    TSNEEmbeddingCache.clear()
+    computed_features = _mock_compute_tsne_embedding(monkeypatch)
+    app.config['TSNE_CACHE_MAX_ENTRIES'] = 1
+    app.config['TSNE_BACKGROUND_EMBEDDING'] = True
+    features = pd.DataFrame({'f1': [0.5, -1.0, 0.5], 'f2': [1.0, 0.0, -1.0]})
+    other_features = features * 2
+
+    with app.app_context():
+        TSNEEmbeddingCache.compute_in_background(features)
+        embedding = TSNEEmbeddingCache.get_embedding(features.copy())
+        assert len(computed_features) == 1
+        assert np.array_equal(embedding, [[1.5, 0], [-1.0, 1], [-0.5, 2]])
+
+        # The least recently used embedding is evicted
+        TSNEEmbeddingCache.get_embedding(other_features)
+        TSNEEmbeddingCache.get_embedding(features)
+        assert len(computed_features) == 3
+
+
+def test_tsne_embedding_is_not_cached_without_entries(monkeypatch):
+    computed_features = _mock_compute_tsne_embedding(monkeypatch)
+    features = pd.DataFrame({'f1': [0.5, -1.0, 0.5]})
+
+    TSNEEmbeddingCache.compute_in_background(features)
+    TSNEEmbeddingCache.get_embedding(features)
+    TSNEEmbeddingCache.get_embedding(features)
+
+    assert len(computed_features) == 2
+
+
+def test_projection_is_selected_by_row_count(monkeypatch):
+    embedded_rows = []
+
+    def mock_embed_with_tsne(values):
+        embedded_rows.append(len(values))
+        return values[:, :2]
+
+    monkeypatch.setattr(tsne_embedding_cache, 'TSNE_MAX_ROWS', 20)
+    monkeypatch.setattr(tsne_embedding_cache, 'LANDMARK_TSNE_MAX_ROWS', 100)
+    monkeypatch.setattr(tsne_embedding_cache, 'TSNE_LANDMARKS', 10)
+    monkeypatch.setattr(tsne_embedding_cache, '_embed_with_tsne', mock_embed_with_tsne)
+    rng = np.random.default_rng(42)
+
+    embedding = tsne_embedding_cache.compute_tsne_embedding(pd.DataFrame(rng.normal(size=(20, 3))))
+    assert embedding.shape == (20, 2)
+    assert embedded_rows == [20]
+
+    landmark_values = rng.normal(size=(60, 3))
+    embedding = tsne_embedding_cache.compute_tsne_embedding(pd.DataFrame(landmark_values))
+    assert embedding.shape == (60, 2)
+    assert embedded_rows == [20, 10]
+    # Rows are placed within the range of the landmark embeddings
+    assert embedding.min() >= landmark_values[:, :2].min() and embedding.max() <= landmark_values[:, :2].max()
+
+    embedding = tsne_embedding_cache.compute_tsne_embedding(pd.DataFrame(rng.normal(size=(101, 1))))
+    assert embedding.shape == (101, 2)
+    assert np.all(embedding[:, 1] == 0)
+    assert embedded_rows == [20, 10]
+
+
+def test_wide_features_are_reduced_before_tsne(monkeypatch):
+    embedded_shapes = []
+
+    def mock_embed_with_tsne(values):
+        embedded_shapes.append(values.shape)
+        return values[:, :2]
+
+    monkeypatch.setattr(tsne_embedding_cache, '_embed_with_tsne', mock_embed_with_tsne)
+
+    tsne_embedding_cache.compute_tsne_embedding(pd.DataFrame(np.random.default_rng(42).normal(size=(80, 60))))
+
+    assert embedded_shapes == [(80, 50)]
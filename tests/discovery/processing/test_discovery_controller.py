@@ -1,4 +1,5 @@
 import json
+import re
 
 import pandas as pd
 
@@ -8,6 +9,7 @@ from slamd.discovery.processing.discovery_service import DiscoveryService
 from slamd.discovery.processing.forms.targets_form import TargetsForm
 from slamd.discovery.processing.forms.upload_dataset_form import UploadDatasetForm
 from slamd.discovery.processing.models.dataset import Dataset
+from slamd.discovery.processing.models.prediction_page import PredictionPage
 from slamd.discovery.processing.targets_service import TargetsService, TargetPageData
 
 
@@ -59,17 +61,126 @@ def test_slamd_runs_experiment_and_shows_result(client, monkeypatch):
     assert response.status_code == 200
 
     template = json.loads(response.data.decode('utf-8'))['template']
-    assert '<table ' in template
-    assert 'id="formulations_dataframe"' in template
+    prediction_page = _parse_prediction_page(template)
+    assert prediction_page['columns'] == ['feature', 'prediction']
+    assert prediction_page['rows'] == [[1, 3], [2, 4]]
+    assert prediction_page['page'] == 1
+    assert prediction_page['total_rows'] == 2
+    assert 'stage-timings-table' not in template
 
-    assert '<th>feature</th>' in template
-    assert '<th>prediction</th>' in template
 
-    assert '<td>1</td>' in template
-    assert '<td>3</td>' in template
+def test_slamd_shows_stage_timings_with_result_if_available(client, monkeypatch):
+    def mock_run_experiment(dataset_name, request):
+        data = {'feature': [1, 2], 'prediction': [3, 4]}
+        return pd.DataFrame.from_dict(data), None
 
-    assert '<td>2</td>' in template
-    assert '<td>4</td>' in template
+    def mock_query_experiment_timings():
+        return [{'stage': 'preprocess', 'seconds': 0.0123, 'peak_memory_increase_mb': 0.0,
+                 'process_peak_memory_mb': 150.2},
+                {'stage': 'fit', 'seconds': 1.5, 'peak_memory_increase_mb': 30.5, 'process_peak_memory_mb': 180.7,
+                 'targets': ['y', 'z']}]
+
+    monkeypatch.setattr(DiscoveryService, 'run_experiment', mock_run_experiment)
+    monkeypatch.setattr(DiscoveryService, 'query_experiment_timings', mock_query_experiment_timings)
+
+    response = client.post('/materials/discovery/test_dataset', data=b'{}')
+
+    template = json.loads(response.data.decode('utf-8'))['template']
+    assert 'stage-timings-table' in template
+    assert '<td>y, z</td>' in template
+    assert '<td>1.500</td>' in template
+    assert '<td>30.5</td>' in template
+
+
+def test_slamd_rescores_experiment_and_shows_result(client, monkeypatch):
+    mock_rescore_experiment_called_with = None
+
+    def mock_rescore_experiment(dataset_name, request):
+        nonlocal mock_rescore_experiment_called_with
+        mock_rescore_experiment_called_with = dataset_name
+        data = {'feature': [1, 2], 'prediction': [3, 4]}
+        return pd.DataFrame.from_dict(data), None
+
+    monkeypatch.setattr(DiscoveryService, 'rescore_experiment', mock_rescore_experiment)
+
+    response = client.post('/materials/discovery/test_dataset/rescore', data=b'{}')
+
+    assert response.status_code == 200
+    assert mock_rescore_experiment_called_with == 'test_dataset'
+
+    template = json.loads(response.data.decode('utf-8'))['template']
+    assert _parse_prediction_page(template)['columns'] == ['feature', 'prediction']
+
+
+def test_slamd_submits_experiment_job_if_rescore_requires_fitting_again(client, monkeypatch):
+    monkeypatch.setattr(DiscoveryService, 'rescore_experiment', lambda dataset_name, request: 'job id')
+
+    response = client.post('/materials/discovery/test_dataset/rescore', data=b'{}')
+
+    assert response.status_code == 202
+    assert json.loads(response.data.decode('utf-8')) == {'job_id': 'job id'}
+
+
+def test_slamd_submits_experiment_job(client, monkeypatch):
+    mock_submit_experiment_called_with = None
+
+    def mock_submit_experiment(dataset_name, request):
+        nonlocal mock_submit_experiment_called_with
+        mock_submit_experiment_called_with = dataset_name
+        return 'job id'
+
+    monkeypatch.setattr(DiscoveryService, 'submit_experiment', mock_submit_experiment)
+
+    response = client.post('/materials/discovery/test_dataset/jobs', data=b'{}')
+
+    assert response.status_code == 202
+    assert mock_submit_experiment_called_with == 'test_dataset'
+    assert json.loads(response.data.decode('utf-8')) == {'job_id': 'job id'}
+
+
+def test_slamd_returns_status_of_unfinished_experiment_job(client, monkeypatch):
+    monkeypatch.setattr(DiscoveryService, 'collect_experiment_result', lambda job_id: None)
+    monkeypatch.setattr(DiscoveryService, 'query_experiment_status', lambda job_id: 'running')
+
+    response = client.get('/materials/discovery/jobs/job-id/result')
+
+    assert response.status_code == 202
+    assert json.loads(response.data.decode('utf-8')) == {'job_id': 'job-id', 'status': 'running'}
+
+
+def test_slamd_shows_result_of_finished_experiment_job(client, monkeypatch):
+    def mock_collect_experiment_result(job_id):
+        data = {'feature': [1, 2], 'prediction': [3, 4]}
+        return pd.DataFrame.from_dict(data), None
+
+    monkeypatch.setattr(DiscoveryService, 'collect_experiment_result', mock_collect_experiment_result)
+
+    response = client.get('/materials/discovery/jobs/job-id/result')
+
+    assert response.status_code == 200
+    template = json.loads(response.data.decode('utf-8'))['template']
+    assert _parse_prediction_page(template)['rows'] == [[1, 3], [2, 4]]
+
+
+def test_slamd_returns_requested_page_of_prediction(client, monkeypatch):
+    mock_query_prediction_page_called_with = None
+
+    def mock_query_prediction_page(**kwargs):
+        nonlocal mock_query_prediction_page_called_with
+        mock_query_prediction_page_called_with = kwargs
+        return PredictionPage(columns=['feature', 'prediction'], rows=[[2, 4]], page=2, page_size=1, total_rows=2,
+                              filtered_rows=2, sort_by='prediction', ascending=False)
+
+    monkeypatch.setattr(DiscoveryService, 'query_prediction_page', mock_query_prediction_page)
+
+    response = client.get('/materials/discovery/prediction?page=2&page_size=1&sort_by=prediction&ascending=false')
+
+    assert response.status_code == 200
+    assert mock_query_prediction_page_called_with == {'page': 2, 'page_size': 1, 'sort_by': 'prediction',
+                                                      'ascending': False, 'search': ''}
+    prediction_page = json.loads(response.data.decode('utf-8'))
+    assert prediction_page['rows'] == [[2, 4]]
+    assert prediction_page['page'] == 2
 
 
 def test_slamd_generates_tsne_plot(client, monkeypatch):
@@ -169,3 +280,8 @@ def _assert_target_page_table_headers(template):
     assert '<th>feature2</th>' in template
     assert '<th>Formulation Index</th>' in template
     assert '<th>Feature Summary</th>' in template
+
+
+def _parse_prediction_page(template):
+    placeholder = re.search(r'<div id="prediction-table-placeholder"[^>]*>(.*?)</div>', template, re.DOTALL)
+    return json.loads(placeholder.group(1))
@@ -6,12 +6,16 @@ from pandas import DataFrame
 from werkzeug.datastructures import FileStorage, ImmutableMultiDict
 
 from slamd import create_app
-from slamd.common.error_handling import DatasetNotFoundException, PlotDataNotFoundException
+from slamd.common.error_handling import DatasetNotFoundException, PlotDataNotFoundException, \
+    ValueNotSupportedException
 from slamd.discovery.processing.discovery_persistence import DiscoveryPersistence
 from slamd.discovery.processing.discovery_service import DiscoveryService
+from slamd.discovery.processing.experiment.experiment_data import ExperimentData
+from slamd.discovery.processing.experiment.experiment_postprocessor import ExperimentPostprocessor
 from slamd.discovery.processing.experiment.plot_generator import PlotGenerator
 from slamd.discovery.processing.forms.upload_dataset_form import UploadDatasetForm
 from slamd.discovery.processing.models.dataset import Dataset
+from slamd.discovery.processing.models.experiment_result import ExperimentResult
 from slamd.discovery.processing.models.prediction import Prediction
 from slamd.discovery.processing.models.tsne_plot_data import TSNEPlotData
 from slamd.discovery.processing.strategies.csv_strategy import CsvStrategy
@@ -131,6 +135,101 @@ def test_download_prediction(monkeypatch):
     assert filename.endswith('.xlsx')
 
 
+def test_download_prediction_creates_complete_table_if_only_top_rows_are_stored(monkeypatch):
+    experiment_result = ExperimentResult(utility=pd.Series([3.0, 2.0, 1.0]))
+    experiment = ExperimentData(dataframe=pd.DataFrame())
+    complete_dataframe = pd.DataFrame({'Row number': [1, 2, 3]})
+
+    def mock_query_prediction():
+        return Prediction('test_dataset.csv', complete_dataframe.iloc[:1], experiment_result=experiment_result)
+
+    def mock_restore_experiment(prediction, dataframe, request_body):
+        assert prediction.experiment_result is experiment_result
+        return experiment
+
+    mock_create_prediction_excel_called_with = None
+
+    def mock_create_prediction_excel(dataset, prediction):
+        nonlocal mock_create_prediction_excel_called_with
+        mock_create_prediction_excel_called_with = prediction
+        return 'Dummy.xslx'
+
+    monkeypatch.setattr(DiscoveryPersistence, 'query_prediction', mock_query_prediction)
+    monkeypatch.setattr(DiscoveryPersistence, 'query_dataset_by_name',
+                        lambda dataset_name: Dataset(name=dataset_name, dataframe=pd.DataFrame()))
+    monkeypatch.setattr(DiscoveryService, '_restore_experiment', mock_restore_experiment)
+    monkeypatch.setattr(ExperimentPostprocessor, 'create_output_table',
+                        lambda exp: complete_dataframe if exp is experiment else None)
+    monkeypatch.setattr(ExcelStrategy, 'create_prediction_excel', mock_create_prediction_excel)
+
+    DiscoveryService.download_prediction()
+
+    assert mock_create_prediction_excel_called_with.dataframe is complete_dataframe
+
+
+def test_query_prediction_page_raises_exception_when_no_prediction_can_be_found(monkeypatch):
+    monkeypatch.setattr(DiscoveryPersistence, 'query_prediction', lambda: {})
+
+    with pytest.raises(DatasetNotFoundException):
+        DiscoveryService.query_prediction_page()
+
+
+def test_query_prediction_page_returns_page_of_stored_prediction(monkeypatch):
+    dataframe = pd.DataFrame({'Row number': [1, 2, 3, 4, 5], 'Utility': [5.0, 4.0, 3.0, 2.0, None]})
+    monkeypatch.setattr(DiscoveryPersistence, 'query_prediction', lambda: Prediction('test_dataset.csv', dataframe))
+
+    prediction_page = DiscoveryService.query_prediction_page(page=3, page_size=2)
+
+    assert prediction_page.columns == ['Row number', 'Utility']
+    assert prediction_page.rows == [[5, None]]
+    assert prediction_page.page == 3
+    assert prediction_page.total_rows == 5
+    assert prediction_page.filtered_rows == 5
+
+
+def test_query_experiment_timings_returns_timings_of_stored_experiment_only_if_enabled(monkeypatch):
+    timings = [{'stage': 'preprocess', 'seconds': 0.1, 'peak_memory_increase_mb': 0.0,
+                'process_peak_memory_mb': 100.0}]
+    monkeypatch.setattr(DiscoveryPersistence, 'query_prediction',
+                        lambda: Prediction('test_dataset.csv', pd.DataFrame(),
+                                           experiment_result=ExperimentResult(timings=timings)))
+
+    with app.app_context():
+        assert DiscoveryService.query_experiment_timings() is None
+
+        monkeypatch.setitem(app.config, 'SHOW_EXPERIMENT_TIMINGS', True)
+        assert DiscoveryService.query_experiment_timings() == timings
+
+
+def test_create_prediction_page_sorts_and_filters_rows():
+    dataframe = pd.DataFrame({'Row number': [1, 2, 3, 4], 'Name': ['Alpha', 'beta', 'Gamma', 'alphabet'],
+                              'Utility': [4.0, 3.0, 2.0, 1.0]})
+
+    prediction_page = DiscoveryService.create_prediction_page(dataframe, sort_by='Utility', search='ALPHA')
+
+    assert prediction_page.rows == [[4, 'alphabet', 1.0], [1, 'Alpha', 4.0]]
+    assert prediction_page.total_rows == 4
+    assert prediction_page.filtered_rows == 2
+
+
+def test_create_prediction_page_clamps_page_to_last_page():
+    dataframe = pd.DataFrame({'Row number': [1, 2, 3]})
+
+    assert DiscoveryService.create_prediction_page(dataframe, page=5, page_size=2).page == 2
+    assert DiscoveryService.create_prediction_page(dataframe.iloc[:0], page=5, page_size=2).page == 1
+
+
+def test_create_prediction_page_raises_exception_for_invalid_request():
+    dataframe = pd.DataFrame({'Row number': [1, 2, 3]})
+
+    with pytest.raises(ValueNotSupportedException):
+        DiscoveryService.create_prediction_page(dataframe, page=0)
+    with pytest.raises(ValueNotSupportedException):
+        DiscoveryService.create_prediction_page(dataframe, page_size=0)
+    with pytest.raises(ValueNotSupportedException):
+        DiscoveryService.create_prediction_page(dataframe, sort_by='Unknown')
+
+
 def test_create_tsne_plot_raises_exception_when_no_plot_data_can_be_found(monkeypatch):
     def mock_get_session_tsne_plot_data():
         return {}
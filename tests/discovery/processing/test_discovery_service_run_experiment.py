@@ -1,10 +1,21 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 import numpy as np
 import pandas as pd
+import pytest
 
+from slamd.common.error_handling import ExperimentJobNotFoundException, ValueNotSupportedException
 from slamd.discovery.processing.discovery_persistence import DiscoveryPersistence
 from slamd.discovery.processing.discovery_service import DiscoveryService
+from slamd.discovery.processing.experiment.experiment_conductor import ExperimentConductor
+from slamd.discovery.processing.experiment import experiment_job_pool
+from slamd.discovery.processing.experiment.experiment_job_pool import ExperimentJobPool, FINISHED
 from slamd.discovery.processing.experiment.plot_generator import PlotGenerator
 from slamd.discovery.processing.models.dataset import Dataset
+from slamd.discovery.processing.models.experiment_job import ExperimentJob
+from slamd.discovery.processing.models.experiment_result import ExperimentResult
+from slamd.discovery.processing.models.prediction import Prediction
 from tests.discovery.processing.test_dataframe_dicts import *
 
 
@@ -130,6 +141,193 @@ def test_run_experiment_with_partially_labelled_data(monkeypatch):
     assert mock_save_prediction_called_with.metadata == TEST_GAUSS_WITH_PART_LABELS_CONFIG
 
 
+def test_rescore_experiment_reuses_stored_prediction(monkeypatch):
+    saved_prediction = None
+
+    def mock_save_prediction(prediction):
+        nonlocal saved_prediction
+        saved_prediction = prediction
+        return None
+
+    def mock_query_prediction():
+        return saved_prediction
+
+    monkeypatch.setattr(DiscoveryPersistence, 'save_prediction', mock_save_prediction)
+    monkeypatch.setattr(DiscoveryPersistence, 'query_prediction', mock_query_prediction)
+    monkeypatch.setattr(DiscoveryPersistence, 'save_tsne_plot_data', lambda tsne_plot_data: None)
+    _mock_dataset_and_plot(monkeypatch, TEST_GAUSS_WITH_PART_LABELS_INPUT, ['targ1', 'targ2'])
+
+    DiscoveryService.run_experiment('test_data', TEST_GAUSS_WITH_PART_LABELS_CONFIG)
+    previous_prediction = saved_prediction.experiment_result.prediction.copy()
+
+    def mock_fit_model_and_predict(exp):
+        raise AssertionError('The model must not be fitted again')
+
+    monkeypatch.setattr(ExperimentConductor, '_fit_model_and_predict', mock_fit_model_and_predict)
+
+    rescore_config = {**TEST_GAUSS_WITH_PART_LABELS_CONFIG, 'curiosity': '-1.0'}
+    df_with_prediction, scatter_plot = DiscoveryService.rescore_experiment('test_data', rescore_config)
+
+    assert saved_prediction.metadata == rescore_config
+    assert saved_prediction.experiment_result.prediction.equals(previous_prediction)
+    assert df_with_prediction.replace({np.nan: None}).to_dict() != TEST_GAUSS_WITH_PART_LABELS_PRED
+    assert scatter_plot == 'Dummy Plot'
+
+
+def _with_apriori_configurations(request_body, *configurations):
+    return {**request_body, 'a_priori_information_configurations': [
+        {'max_or_min': max_or_min, 'weight': '1.00', 'threshold': threshold}
+        for (max_or_min, threshold) in configurations
+    ]}
+
+
+@pytest.mark.parametrize('stored_config, rescore_config', [
+    (TEST_GAUSS_WITH_PART_LABELS_CONFIG,
+     {**TEST_GAUSS_WITH_PART_LABELS_CONFIG, 'model': 'lolo Random Forest (AI model)'}),
+    (_with_apriori_configurations(TEST_GAUSS_WITH_PART_LABELS_CONFIG, ('max', '5.0'), ('max', '')),
+     _with_apriori_configurations(TEST_GAUSS_WITH_PART_LABELS_CONFIG, ('min', '5.0'), ('max', ''))),
+])
+def test_rescore_experiment_submits_experiment_if_fit_configuration_changed(monkeypatch, stored_config,
+                                                                           rescore_config):
+    stored_prediction = Prediction('test_data', pd.DataFrame(), stored_config, ExperimentResult())
+    mock_submit_experiment_called_with = None
+
+    def mock_submit_experiment(dataset_name, request_body):
+        nonlocal mock_submit_experiment_called_with
+        mock_submit_experiment_called_with = request_body
+        return 'job id'
+
+    monkeypatch.setattr(DiscoveryPersistence, 'query_prediction', lambda: stored_prediction)
+    monkeypatch.setattr(DiscoveryService, 'submit_experiment', mock_submit_experiment)
+    _mock_dataset_and_plot(monkeypatch, TEST_GAUSS_WITH_PART_LABELS_INPUT, ['targ1', 'targ2'])
+    stored_prediction.dataset_fingerprint = DiscoveryService._fingerprint_dataset(
+        pd.DataFrame.from_dict(TEST_GAUSS_WITH_PART_LABELS_INPUT), stored_config)
+
+    assert DiscoveryService.rescore_experiment('test_data', rescore_config) == 'job id'
+    assert mock_submit_experiment_called_with == rescore_config
+
+
+def test_rescore_experiment_submits_experiment_if_no_prediction_is_stored(monkeypatch):
+    # The session returns an empty dict if no prediction has been stored yet
+    monkeypatch.setattr(DiscoveryPersistence, 'query_prediction', lambda: {})
+    monkeypatch.setattr(DiscoveryService, 'submit_experiment', lambda dataset_name, request_body: 'job id')
+    _mock_dataset_and_plot(monkeypatch, TEST_GAUSS_WITH_PART_LABELS_INPUT, ['targ1', 'targ2'])
+
+    assert DiscoveryService.rescore_experiment('test_data', TEST_GAUSS_WITH_PART_LABELS_CONFIG) == 'job id'
+
+
+def test_fit_configuration_changes_with_direction_of_apriori_threshold():
+    thresholded_config = _with_apriori_configurations(TEST_GAUSS_WITH_PART_LABELS_CONFIG, ('max', '5.0'), ('max', ''))
+
+    flipped_threshold_config = _with_apriori_configurations(TEST_GAUSS_WITH_PART_LABELS_CONFIG, ('min', '5.0'),
+                                                            ('max', ''))
+    assert DiscoveryService._fit_configuration_changed(thresholded_config, flipped_threshold_config)
+
+    # Without a threshold the direction only changes the utility
+    flipped_config = _with_apriori_configurations(TEST_GAUSS_WITH_PART_LABELS_CONFIG, ('max', '5.0'), ('min', ''))
+    assert not DiscoveryService._fit_configuration_changed(thresholded_config, flipped_config)
+
+
+def test_submit_experiment_runs_experiment_in_background_and_saves_result(monkeypatch):
+    saved_prediction = None
+
+    def mock_save_prediction(prediction):
+        nonlocal saved_prediction
+        saved_prediction = prediction
+        return None
+
+    monkeypatch.setattr(DiscoveryPersistence, 'save_prediction', mock_save_prediction)
+    monkeypatch.setattr(DiscoveryPersistence, 'save_tsne_plot_data', lambda tsne_plot_data: None)
+    _mock_dataset_and_plot(monkeypatch, TEST_GAUSS_WITHOUT_THRESH_INPUT, 'Target: X')
+    # Run the job in a thread of this process so that the mocks above apply
+    monkeypatch.setattr(ExperimentJobPool, '_get_executor', lambda: ThreadPoolExecutor(max_workers=1))
+
+    expected_df_with_prediction, _ = DiscoveryService.run_experiment('test_data', TEST_GAUSS_WITHOUT_THRESH_CONFIG)
+
+    job_id = DiscoveryService.submit_experiment('test_data', TEST_GAUSS_WITHOUT_THRESH_CONFIG)
+    ExperimentJobPool.query_job(job_id, 'owner').future.result()
+
+    assert DiscoveryService.query_experiment_status(job_id) == FINISHED
+
+    df_with_prediction, scatter_plot = DiscoveryService.collect_experiment_result(job_id)
+
+    assert df_with_prediction.equals(expected_df_with_prediction)
+    assert scatter_plot == 'Dummy Plot'
+    assert saved_prediction.dataset_used_for_prediction == 'test_data'
+    assert saved_prediction.metadata == TEST_GAUSS_WITHOUT_THRESH_CONFIG
+    assert saved_prediction.experiment_result is not None
+    assert ExperimentJobPool.query_job(job_id, 'owner') is None
+
+
+def test_collect_experiment_result_raises_error_of_failed_job(monkeypatch):
+    def mock_run(exp):
+        raise ValueNotSupportedException('Invalid value')
+
+    _mock_dataset_and_plot(monkeypatch, TEST_GAUSS_WITHOUT_THRESH_INPUT, 'Target: X')
+    monkeypatch.setattr(ExperimentConductor, 'run', mock_run)
+    monkeypatch.setattr(ExperimentJobPool, '_get_executor', lambda: ThreadPoolExecutor(max_workers=1))
+
+    job_id = DiscoveryService.submit_experiment('test_data', TEST_GAUSS_WITHOUT_THRESH_CONFIG)
+    ExperimentJobPool.query_job(job_id, 'owner').future.exception()
+
+    with pytest.raises(ValueNotSupportedException):
+        DiscoveryService.collect_experiment_result(job_id)
+
+
+def test_query_experiment_status_raises_error_for_unknown_job(monkeypatch):
+    monkeypatch.setattr(DiscoveryPersistence, 'query_session_id', lambda: 'owner')
+
+    with pytest.raises(ExperimentJobNotFoundException):
+        DiscoveryService.query_experiment_status('unknown')
+
+
+def test_query_experiment_status_raises_error_for_job_of_other_session(monkeypatch):
+    _mock_dataset_and_plot(monkeypatch, TEST_GAUSS_WITHOUT_THRESH_INPUT, 'Target: X')
+    monkeypatch.setattr(ExperimentConductor, 'run', lambda exp: None)
+    monkeypatch.setattr(ExperimentJobPool, '_get_executor', lambda: ThreadPoolExecutor(max_workers=1))
+
+    job_id = DiscoveryService.submit_experiment('test_data', TEST_GAUSS_WITHOUT_THRESH_CONFIG)
+    monkeypatch.setattr(DiscoveryPersistence, 'query_session_id', lambda: 'other owner')
+
+    with pytest.raises(ExperimentJobNotFoundException):
+        DiscoveryService.query_experiment_status(job_id)
+    with pytest.raises(ExperimentJobNotFoundException):
+        DiscoveryService.collect_experiment_result(job_id)
+
+
+def test_finished_jobs_are_evicted_after_their_ttl(app, monkeypatch):
+    monkeypatch.setattr(ExperimentJobPool, '_get_executor', lambda: ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(ExperimentConductor, 'run', lambda exp: None)
+
+    with app.app_context():
+        finished_job_id = ExperimentJobPool.submit(None, 'test_data', {}, 0, 'owner')
+        ExperimentJobPool.query_job(finished_job_id, 'owner').future.result()
+        assert ExperimentJobPool.query_job(finished_job_id, 'owner') is not None
+
+        app.config['EXPERIMENT_JOB_TTL'] = 0
+        running_job = ExperimentJob('running', future=Future(), owner='owner')
+        monkeypatch.setitem(ExperimentJobPool._jobs, 'running', running_job)
+
+        assert ExperimentJobPool.query_job(finished_job_id, 'owner') is None
+        assert ExperimentJobPool.query_job('running', 'owner') is running_job
+
+
+def test_submit_replaces_broken_job_pool_and_retries(monkeypatch):
+    class BrokenExecutor:
+        def submit(self, fn, *args):
+            raise BrokenProcessPool('A worker died')
+
+    monkeypatch.setattr(ExperimentJobPool, '_executor', BrokenExecutor())
+    monkeypatch.setattr(experiment_job_pool, 'create_experiment_executor',
+                        lambda max_workers: ThreadPoolExecutor(max_workers=max_workers))
+    monkeypatch.setattr(ExperimentConductor, 'run', lambda exp: 'result')
+
+    job_id = ExperimentJobPool.submit(None, 'test_data', {}, 0, 'owner')
+
+    assert ExperimentJobPool.query_job(job_id, 'owner').future.result() == (None, 'result')
+    assert isinstance(ExperimentJobPool._executor, ThreadPoolExecutor)
+
+
 def _mock_dataset_and_plot(monkeypatch, data, target_names):
     def mock_query_dataset_by_name(dataset_name):
         test_df = pd.DataFrame.from_dict(data)
@@ -139,8 +337,9 @@ def _mock_dataset_and_plot(monkeypatch, data, target_names):
             return Dataset('test_data', target_names, test_df)
 
     # We do not want to test the creation of the actual plot but rather that the PlotGenerator is called
-    def mock_create_target_scatter_plot(targets):
+    def mock_create_target_scatter_plot(targets, n_rows=None):
         return 'Dummy Plot'
 
     monkeypatch.setattr(DiscoveryPersistence, 'query_dataset_by_name', mock_query_dataset_by_name)
+    monkeypatch.setattr(DiscoveryPersistence, 'query_session_id', lambda: 'owner')
     monkeypatch.setattr(PlotGenerator, 'create_target_scatter_plot', mock_create_target_scatter_plot)